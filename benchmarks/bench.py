@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Benchmarks of the parsing, matching and next-occurrence paths.
+
+    python -m benchmarks.bench                   run and print timings
+    python -m benchmarks.bench --save            also write the baseline
+    python -m benchmarks.bench --compare         fail on regressions against
+                                                 the baseline, or on benchmarks
+                                                 missing from it
+
+    Timings are the best of --repeat repeats (default 7), in microseconds per
+    operation. Baselines are machine specific: save one on the machine you
+    compare on, on an otherwise idle machine. With the default repeats two
+    back to back runs can differ by up to about 30% on a shared machine, so
+    the default 25% threshold is within the noise there: raise --repeat
+    (20 or more) for both the saved and the compared runs, or raise
+    --threshold. Re-save the baseline whenever a benchmark is added.
+"""
+
+from __future__ import absolute_import, print_function
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import sys
+import timeit
+
+from src.aws_croniter import PARSED_FIELDS, CronExpression, Croniter
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Real-world EventBridge style schedules.
+EXPRESSIONS = [
+    '0 10 * * ? *',
+    '15 12 * * ? *',
+    '0 18 ? * MON-FRI *',
+    '0 8 1 * ? *',
+    '*/15 * * * ? *',
+    '*/10 * ? * MON-FRI *',
+    '*/5 8-17 ? * MON-FRI *',
+    '0 9 ? * 2#1 *',
+    '0 0 ? * SUN *',
+    '30 2 ? * SAT#3 *',
+    '0 12 15 1,4,7,10 ? *',
+    '0 0 1 1 ? 2025-2030',
+    '0 */2 * ? * * *',
+    '5,35 14 * * ? *',
+    '0 0 9 ? * MON,WED,FRI *',
+    '10 */30 6-22 ? * * *',
+]
+
+WINDOWS = [
+    ('1s', datetime.timedelta(seconds=1)),
+    ('1min', datetime.timedelta(minutes=1)),
+    ('1h', datetime.timedelta(hours=1)),
+    ('1d', datetime.timedelta(days=1)),
+    ('1y', datetime.timedelta(days=365)),
+    ('10y', datetime.timedelta(days=3652)),
+    ('50y', datetime.timedelta(days=18262)),
+]
+
+START = datetime.datetime(2018, 1, 1, 0, 0, 1)
+
+
+# Repeats per benchmark, see timed.
+REPEAT = 7
+
+
+def timed(function, repeat=None):
+    """
+        Best of several repeats of at least 0.2s each, in microseconds per
+        call.
+    """
+    if repeat is None:
+        repeat = REPEAT
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    number *= 2
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def bench_parse():
+    def parse():
+        for expression in EXPRESSIONS:
+            CronExpression(expression)
+    yield 'parse/corpus', timed(parse) / len(EXPRESSIONS)
+
+    def parse_uncached():
+        for parsed_fields in PARSED_FIELDS.values():
+            parsed_fields.clear()
+        parse()
+    yield 'parse/uncached', timed(parse_uncached) / len(EXPRESSIONS)
+
+
+def bench_executes_between():
+    obj_expression = CronExpression('30 2 ? * SAT#3 *')
+    awscron_iter = Croniter(obj_expression, START)
+    for name, window in WINDOWS:
+        end = START + window
+        yield 'executes_between/{}'.format(name), timed(
+            lambda: awscron_iter.executes_between(START, end)
+        )
+
+
+def from_start(cron, method):
+    """
+        Calls method from the iterator's start time on every run, so every
+        call does the same amount of work.
+    """
+    start = cron.cur
+
+    def call():
+        cron.cur = start
+        return method()
+    return call
+
+
+def bench_aws_get_next():
+    for expression in ('*/5 8-17 ? * MON-FRI *', '30 2 ? * SAT#3 *'):
+        awscron_iter = Croniter(CronExpression(expression), START)
+        yield 'aws_get_next/{}'.format(expression), timed(
+            from_start(awscron_iter, awscron_iter.get_next)
+        )
+        yield 'aws_get_prev/{}'.format(expression), timed(
+            from_start(awscron_iter, awscron_iter.get_prev)
+        )
+
+
+def bench_croniter():
+    try:
+        from src.croniter import croniter
+        from dateutil import tz
+    except ImportError as error:
+        print('skipping croniter benchmarks: {}'.format(error))
+        return
+
+    zone = tz.gettz('America/New_York')
+    cases = [
+        ('naive', '*/5 8-17 * * 1-5', START),
+        ('tz', '*/5 8-17 * * 1-5', START.replace(tzinfo=zone)),
+        # Daily job whose next and previous runs cross the DST change.
+        ('tz_dst', '30 2 * * *',
+         datetime.datetime(2018, 3, 11, 12, tzinfo=zone)),
+    ]
+    for name, expression, start_time in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            cron = croniter(expression, start_time)
+        yield 'croniter_get_next/{}'.format(name), timed(
+            from_start(cron, cron.get_next)
+        )
+        yield 'croniter_get_prev/{}'.format(name), timed(
+            from_start(cron, cron.get_prev)
+        )
+
+
+BENCHMARKS = [
+    bench_parse, bench_executes_between, bench_aws_get_next, bench_croniter
+]
+
+
+def run():
+    results = {}
+    for benchmark in BENCHMARKS:
+        for name, microseconds in benchmark():
+            results[name] = microseconds
+            print('{:<45} {:>12.2f} us'.format(name, microseconds))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+        Names of the benchmarks slower than baseline by more than threshold,
+        or missing from baseline.
+    """
+    regressions = []
+    for name, microseconds in sorted(results.items()):
+        if name not in baseline:
+            regressions.append(name)
+            print('{:<45} {:>9}  NO BASELINE'.format(name, '-'))
+            continue
+        ratio = microseconds / baseline[name]
+        marker = ''
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            marker = '  REGRESSION'
+        print('{:<45} {:>8.2f}x{}'.format(name, ratio, marker))
+    return regressions
+
+
+def main(argv=None):
+    global REPEAT
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--save', action='store_true',
+                        help='write the results as the new baseline')
+    parser.add_argument('--compare', action='store_true',
+                        help='compare the results with the baseline')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown ratio (default 0.25)')
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help='repeats per benchmark, the best is kept '
+                        '(default {})'.format(REPEAT))
+    args = parser.parse_args(argv)
+    REPEAT = args.repeat
+
+    results = run()
+    if args.compare:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        print()
+        if compare(results, baseline, args.threshold):
+            return 1
+    if args.save:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
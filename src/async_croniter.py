@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from itertools import count
+from time import time
+import asyncio
+import datetime
+
+from .aws_croniter import Croniter
+from .scheduler import Scheduler
+
+
+class CronSchedule(object):
+    """
+        Async iterator over the execution times of one expression, fed by
+        an AsyncCronRunner.
+    """
+
+    def __init__(self, runner, rule_id, ret_type=float):
+        self._runner = runner
+        self._queue = asyncio.Queue()
+        self._ret_type = ret_type
+        self.rule_id = rule_id
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        epoch = await self._queue.get()
+        if epoch is None:
+            raise StopAsyncIteration
+        if issubclass(self._ret_type, datetime.datetime):
+            return Croniter.timestamp_to_datetime(epoch)
+        return float(epoch)
+
+    def close(self):
+        """
+            Stops the schedule, pending iterations end.
+        """
+        self._runner._remove(self)
+
+
+class AsyncCronRunner(object):
+    """
+        Drives many schedules from one event loop. All execution times sit
+        in a single Scheduler heap and one loop timer is armed for the
+        earliest of them. Every wake-up recomputes the monotonic deadline
+        from the wall clock, so sleeping does not accumulate drift.
+    """
+
+    def __init__(self, clock=time):
+        self._clock = clock
+        self._scheduler = Scheduler()
+        self._schedules = {}
+        self._rule_ids = count()
+        self._loop = None
+        self._timer = None
+        self._deadline = None
+
+    def schedule(self, obj_expression, start_time=None, ret_type=float):
+        """
+            Returns an async iterator yielding the execution times of
+            obj_expression after start_time (default now) as they happen.
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        rule_id = next(self._rule_ids)
+        schedule = CronSchedule(self, rule_id, ret_type)
+        self._schedules[rule_id] = schedule
+        self._scheduler.add(
+            rule_id, obj_expression,
+            self._clock() if start_time is None else start_time
+        )
+        if rule_id not in self._scheduler:
+            schedule._queue.put_nowait(None)
+        self._arm()
+        return schedule
+
+    def stats(self):
+        return self._scheduler.stats()
+
+    def close(self):
+        for schedule in list(self._schedules.values()):
+            self._remove(schedule)
+
+    def _remove(self, schedule):
+        if self._schedules.pop(schedule.rule_id, None) is None:
+            return
+        if schedule.rule_id in self._scheduler:
+            self._scheduler.remove(schedule.rule_id)
+        schedule._queue.put_nowait(None)
+        self._arm()
+
+    def _arm(self):
+        next_epoch = self._scheduler.next_fire_time()
+        if next_epoch == self._deadline and self._timer is not None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._deadline = next_epoch
+        if next_epoch is None:
+            return
+        delay = next_epoch - self._clock()
+        self._timer = self._loop.call_at(
+            self._loop.time() + max(delay, 0), self._on_timer
+        )
+
+    def _on_timer(self):
+        self._timer = None
+        for rule_id, epoch in self._scheduler.pop_due(self._clock()):
+            schedule = self._schedules[rule_id]
+            schedule._queue.put_nowait(epoch)
+            # Schedules without further executions end their iteration.
+            if rule_id not in self._scheduler:
+                self._remove(schedule)
+        self._deadline = None
+        self._arm()
@@ -2,10 +2,23 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import absolute_import, print_function
+from bisect import bisect_right
+from collections import namedtuple, OrderedDict
+from itertools import islice
 from time import time
+import base64
 import datetime
+import re
+import struct
+import sys
+import threading
+from types import MappingProxyType
 from datetime import timedelta
-import math
+
+try:
+    import zoneinfo
+except ImportError:  # pragma: no cover
+    zoneinfo = None
 
 FIELD_NAMES = [
     'second', 'minute', 'hour', 'day_of_month', 'month', 'day_of_week', 'year'
@@ -21,6 +34,66 @@ RANGES = {
     'year': {'min': 1970, 'max': 2199}
 }
 
+# Names usable in place of the numbers of the month and day_of_week fields.
+NAMED_VALUES = {
+    'month': {
+        'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+        'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+    },
+    'day_of_week': {
+        'sun': 1, 'mon': 2, 'tue': 3, 'wed': 4, 'thu': 5, 'fri': 6,
+        'sat': 7,
+        # A lone 'L' is the last day of the week.
+        'l': 7,
+    },
+}
+
+# One comma separated value of a field: '*' or '?', or a value or range,
+# then an optional '/' increment and '#' week numbers.
+FIELD_VALUE = re.compile(
+    r'(?:([*?])|([0-9a-z]+)(?:-([0-9a-z]+))?)(?:/([0-9]+))?'
+    r'(?:#([0-9]+)(?:-([0-9]+))?)?(?:,|$)'
+)
+
+DAYS = (
+    31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31
+)
+
+# Week-of-month numbers usable after '#' (1st to 5th occurrence).
+ALL_WEEKS = 0b11111
+ALL_WEEKS_DAY_WK = (ALL_WEEKS,) * 7
+
+# Multiplying a 7 bit weekday pattern by this repeats it over 5 weeks.
+REPEAT_WEEKS = sum(1 << (7 * wk_number) for wk_number in range(5))
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# Seconds of the units of rate expressions.
+RATE_UNITS = {'minute': 60, 'hour': 3600, 'day': 86400}
+RATE_PATTERN = re.compile(r'rate\((\d+) (minute|hour|day)(s?)\)$')
+
+# Version of the opaque cursors of Croniter.iter_chunks.
+CURSOR_VERSION = 1
+
+# Binary record of a CompiledExpression: version, flags, then the second,
+# minute, hour, day of month, month and day of week bitmasks, the week
+# number bitmask of every weekday, the year bitmask and the 'L-n', 'nW' and
+# 'nL' bitmasks. The tail is reserved.
+RECORD_VERSION = 1
+RECORD = struct.Struct('<BBQQIIHB7s32sIIB3x')
+# Set when some weekday is restricted to some week numbers ('#').
+RECORD_FLAG_DAY_WK = 1
+
+# Set on the records of rate expressions, which hold the period and the
+# anchor in place of the second and minute bitmasks.
+RECORD_FLAG_RATE = 2
+# Set on the records of 'LW' expressions.
+RECORD_FLAG_LAST_WORKDAY = 4
+
+# Header of a buffer of packed records: magic, version, record size, count.
+RECORD_HEADER = struct.Struct('<4sHHI4x')
+RECORD_MAGIC = b'CRNX'
+
 
 class CroniterError(ValueError):
     pass
@@ -30,47 +103,1347 @@ class CroniterBadCronError(CroniterError):
     pass
 
 
-class CronExpression(object):
-    CALENDAR = {
-        'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-        'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
-        'sun': 1, 'mon': 2, 'tue': 3, 'wed': 4, 'thu': 5, 'fri': 6,
-        'sat': 7,
-    }
+class CroniterBadDateError(CroniterError):
+    pass
 
-    bad_length = 'Cron expression should be 6 or 7 fields. {} is not.'
 
-    def __init__(self, expression):
-        expression = expression.split()
-        if len(expression) == 6:
-            second = None
-            minute, hour, day_of_month, month, day_of_week, year = expression
-        elif len(expression) == 7:
-            second, minute, hour, day_of_month, month, day_of_week, year =\
-                expression
+class CroniterSyntaxError(CroniterBadCronError):
+    """
+        Invalid cron expression, locating the offending value: the name of
+        its field and its character position in the normalized expression.
+    """
+
+    def __init__(self, reason, expression=None, field_name=None,
+                 position=None):
+        self.reason = reason
+        self.expression = expression
+        self.field_name = field_name
+        self.position = position
+        message = reason
+        if field_name is not None:
+            message = '{} ({} at position {} of {!r})'.format(
+                reason, field_name, position, expression
+            )
+        elif position is not None:
+            message = '{} (at position {} of {!r})'.format(
+                reason, position, expression
+            )
+        super(CroniterSyntaxError, self).__init__(message)
+
+    def __reduce__(self):
+        return self.__class__, (
+            self.reason, self.expression, self.field_name, self.position
+        )
+
+
+def is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def days_in_month(year, month):
+    if month == 2 and is_leap(year):
+        return 29
+    return DAYS[month - 1]
+
+
+def days_from_civil(year, month, day):
+    """
+        Number of days from 1970-01-01 to the given proleptic Gregorian date.
+    """
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = (
+        year_of_era * 365 + year_of_era // 4 - year_of_era // 100 +
+        day_of_year
+    )
+    return era * 146097 + day_of_era - 719468
+
+
+def civil_from_days(days):
+    """
+        Inverse of days_from_civil, returns (year, month, day).
+    """
+    days += 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (
+        day_of_era - day_of_era // 1460 + day_of_era // 36524 -
+        day_of_era // 146096
+    ) // 365
+    day_of_year = day_of_era - (
+        365 * year_of_era + year_of_era // 4 - year_of_era // 100
+    )
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = shifted_month + 3 if shifted_month < 10 else shifted_month - 9
+    return year_of_era + era * 400 + (month <= 2), month, day
+
+
+def weekday_from_days(days):
+    """
+        AWS day of week (1 is Sunday, 7 is Saturday) of a day number.
+    """
+    return (days + 4) % 7 + 1
+
+
+MonthInfo = namedtuple('MonthInfo', [
+    'start', 'length', 'first_weekday', 'first_days', 'last_days',
+    'nearest_days', 'last_workday'
+])
+
+
+class CalendarTable(object):
+    """
+        Calendar facts of every month in the supported year range: day
+        number of the 1st, length, weekday of the 1st, the dates of the
+        first and last occurrence of each weekday (indexed by weekday - 1),
+        the day bitmask of the weekday nearest to each date ('W', indexed
+        by date - 1, 0 past the end of the month) and the date of the last
+        weekday ('LW'). Years are built lazily on first use and shared by
+        all expressions.
+
+        Years also fall into 14 kinds, by leap year and weekday of January
+        1st, which share all their month facts: year_kinds holds a sample
+        year and the bitmask of the years (bit 0 is first_year) of each.
+    """
+
+    def __init__(self, first_year=RANGES['year']['min'],
+                 last_year=RANGES['year']['max']):
+        self.first_year = first_year
+        self._years = [None] * (last_year - first_year + 1)
+        kinds = {}
+        for year in range(last_year, first_year - 1, -1):
+            kind = (
+                is_leap(year),
+                weekday_from_days(days_from_civil(year, 1, 1))
+            )
+            sample, mask = kinds.get(kind, (year, 0))
+            kinds[kind] = year, mask | 1 << (year - first_year)
+        self.year_kinds = tuple(kinds.values())
+
+    def month(self, year, month):
+        index = year - self.first_year
+        if 0 <= index < len(self._years):
+            months = self._years[index]
+            if months is None:
+                months = self._years[index] = self.build_year(year)
+            return months[month - 1]
+        # Outside the table, computed on each call.
+        return self.build_month(year, month)
+
+    def nth_weekday(self, year, month, weekday, wk_number):
+        """
+            Date of the wk_number-th given weekday of the month, None if
+            the month has fewer of them.
+        """
+        info = self.month(year, month)
+        day = info.first_days[weekday - 1] + 7 * (wk_number - 1)
+        return day if day <= info.length else None
+
+    def last_weekday(self, year, month, weekday):
+        return self.month(year, month).last_days[weekday - 1]
+
+    @classmethod
+    def build_year(cls, year):
+        return tuple(cls.build_month(year, month) for month in range(1, 13))
+
+    @classmethod
+    def build_month(cls, year, month):
+        start = days_from_civil(year, month, 1)
+        length = days_in_month(year, month)
+        first_weekday = weekday_from_days(start)
+        first_days = tuple(
+            1 + (weekday - first_weekday) % 7 for weekday in range(1, 8)
+        )
+        last_days = tuple(
+            first + 7 * ((length - first) // 7) for first in first_days
+        )
+        nearest_days = tuple(
+            1 << (cls.nearest_workday(day, length, first_weekday) - 1)
+            if day <= length else 0
+            for day in range(1, 32)
+        )
+        last_workday = cls.nearest_workday(length, length, first_weekday)
+        return MonthInfo(
+            start, length, first_weekday, first_days, last_days,
+            nearest_days, last_workday
+        )
+
+    @classmethod
+    def nearest_workday(cls, day, length, first_weekday):
+        """
+            Date of the weekday (Monday to Friday) nearest to day, without
+            leaving the month.
+        """
+        weekday = (first_weekday + day - 2) % 7 + 1
+        if weekday == 7:
+            return day - 1 if day > 1 else day + 2
+        if weekday == 1:
+            return day + 1 if day < length else day - 2
+        return day
+
+
+CALENDAR_TABLE = CalendarTable()
+
+# {(compiled, sample year): running days}, see CompiledExpression.year_days.
+YEAR_DAYS = {}
+YEAR_DAYS_LIMIT = 1 << 16
+
+# Last second of the supported year range.
+EPOCH_MAX = days_from_civil(RANGES['year']['max'] + 1, 1, 1) * 86400 - 1
+
+# Bounds of the first and last UTC offset periods of a ZoneTable.
+PERIOD_MIN = -(1 << 62)
+PERIOD_MAX = 1 << 62
+
+
+class ZoneTable(object):
+    """
+        UTC offset periods of a time zone over the supported year range,
+        found once by stepping through the zone day by day and bisecting
+        every change down to the second. Converting between local and UTC
+        times is then a binary search over the periods.
+
+        Local times skipped when the clock goes forward never run, and
+        local times repeated when it goes back only run at their first
+        instance: the local range of a period excludes the times already
+        covered by the period before it.
+    """
+
+    def __init__(self, tzinfo):
+        self.tzinfo = tzinfo
+        first = days_from_civil(RANGES['year']['min'] - 1, 12, 31) * 86400
+        last = days_from_civil(RANGES['year']['max'] + 1, 1, 2) * 86400
+        offset = self.zone_offset(first)
+        self.transitions = [PERIOD_MIN]
+        self.offsets = [offset]
+        for epoch in range(first + 86400, last + 1, 86400):
+            if self.zone_offset(epoch) == offset:
+                continue
+            low, high = epoch - 86400, epoch
+            while high - low > 1:
+                middle = (low + high) // 2
+                if self.zone_offset(middle) == offset:
+                    low = middle
+                else:
+                    high = middle
+            offset = self.zone_offset(high)
+            self.transitions.append(high)
+            self.offsets.append(offset)
+
+        self.local_starts = [PERIOD_MIN] + [
+            transition + max(offset, previous) for transition, offset, previous
+            in zip(self.transitions[1:], self.offsets[1:], self.offsets)
+        ]
+        self.local_ends = [
+            transition + offset for transition, offset
+            in zip(self.transitions[1:], self.offsets)
+        ] + [PERIOD_MAX]
+
+    def zone_offset(self, epoch):
+        return int(
+            datetime.datetime.fromtimestamp(epoch, self.tzinfo)
+            .utcoffset().total_seconds()
+        )
+
+    def period(self, epoch):
+        """
+            Index of the UTC offset period of a UTC epoch.
+        """
+        return bisect_right(self.transitions, epoch) - 1
+
+    def utc_offset(self, epoch):
+        return self.offsets[self.period(epoch)]
+
+    def utc_epoch(self, local_epoch):
+        """
+            UTC epoch of a local time given as epoch seconds. Repeated local
+            times are read as their first instance, and skipped ones as the
+            transition skipping them.
+        """
+        index = bisect_right(self.local_starts, local_epoch) - 1
+        if local_epoch < self.local_ends[index]:
+            return local_epoch - self.offsets[index]
+        return self.transitions[index + 1]
+
+    def next_epoch(self, compiled, epoch, is_prev=False):
+        """
+            First execution time of compiled, whose fields are local times,
+            at or after the UTC epoch, or the last one at or before it when
+            is_prev is set.
+        """
+        period = self.period(epoch)
+        local = epoch + self.offsets[period]
+        if local < self.local_starts[period]:
+            # Repeated local time, its first instance is already past.
+            local = self.local_starts[period] - is_prev
+        while True:
+            local = compiled.next_epoch(local, is_prev)
+            period = bisect_right(self.local_starts, local) - 1
+            if local < self.local_ends[period]:
+                return local - self.offsets[period]
+            # Skipped local time, resume at the edge of the gap.
+            if is_prev:
+                local = self.local_ends[period] - 1
+            else:
+                local = self.local_starts[period + 1]
+
+    def local_ranges(self, epoch_1, epoch_2):
+        """
+            Yields (first, last, offset) for the local time ranges, both
+            inclusive, running between the UTC epochs epoch_1 and epoch_2.
+        """
+        for period in range(self.period(epoch_1), self.period(epoch_2) + 1):
+            offset = self.offsets[period]
+            first = max(epoch_1 + offset, self.local_starts[period])
+            last = min(epoch_2 + offset, self.local_ends[period] - 1)
+            if first <= last:
+                yield first, last, offset
+
+    def count_between(self, compiled, epoch_1, epoch_2):
+        return sum(
+            compiled.count_between(first, last)
+            for first, last, _ in self.local_ranges(epoch_1, epoch_2)
+        )
+
+    def iter_epochs(self, compiled, first, last):
+        for local_first, local_last, offset in self.local_ranges(first, last):
+            for local in compiled.iter_epochs(local_first, local_last):
+                yield local - offset
+
+
+class ZoneTables(object):
+    """
+        Shared ZoneTable of every time zone, by IANA name or tzinfo.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def get(self, zone):
+        table = self._tables.get(zone)
+        if table is not None:
+            return table
+        if isinstance(zone, str):
+            if zoneinfo is None:
+                raise ImportError('zoneinfo is required for time zone names.')
+            try:
+                tzinfo = zoneinfo.ZoneInfo(zone)
+            except (ValueError, zoneinfo.ZoneInfoNotFoundError):
+                raise CroniterError('Unknown time zone {!r}.'.format(zone))
         else:
-            raise CroniterBadCronError(self.bad_length.format(
-                expression
-            ))
+            tzinfo = zone
+        table = ZoneTable(tzinfo)
+        with self._lock:
+            return self._tables.setdefault(zone, table)
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+
+ZONE_TABLES = ZoneTables()
+
 
-        self.fields = [
-            second, minute, hour, day_of_month, month, day_of_week, year
+def next_bit(mask, bit):
+    """
+        Index of the lowest set bit of mask at or above bit, -1 if none.
+    """
+    if bit > 0:
+        mask >>= bit
+    else:
+        bit = 0
+    if not mask:
+        return -1
+    return bit + (mask & -mask).bit_length() - 1
+
+
+def prev_bit(mask, bit):
+    """
+        Index of the highest set bit of mask at or below bit, -1 if none.
+    """
+    if bit < 0:
+        return -1
+    return (mask & ((2 << bit) - 1)).bit_length() - 1
+
+
+def iter_bits(mask):
+    """
+        Yields the indices of the set bits of mask, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+def field_text(field_name, mask):
+    """
+        Canonical text of a field bitmask: '*' when full, otherwise the
+        sorted values with consecutive runs written as ranges.
+    """
+    low, high = RANGES[field_name]['min'], RANGES[field_name]['max']
+    if mask == (1 << (high - low + 1)) - 1:
+        return '*'
+    runs = []
+    for bit in iter_bits(mask):
+        if runs and runs[-1][1] == bit + low - 1:
+            runs[-1][1] = bit + low
+        else:
+            runs.append([bit + low, bit + low])
+    return ','.join(
+        str(first) if first == last else '{}-{}'.format(first, last)
+        for first, last in runs
+    )
+
+
+def normalize_expression(expression):
+    """
+        Collapses whitespace and case so equal expressions share a key.
+    """
+    return ' '.join(expression.lower().split())
+
+
+# Operators of the fields without any, never mutated.
+NO_OPERATORS = MappingProxyType({})
+
+
+def parse_field(field_name, field, expression=None, position=0):
+    """
+        Single pass parser of a field to its bitmask (bit 0 is the field's
+        minimum value). Returns (mask, operators), operators holding the
+        other CompiledExpression fields the day fields set: the 'L', 'W'
+        and 'nL' bitmasks, and day_wk for day_of_week.
+
+        Raises CroniterSyntaxError locating the offending value, position
+        being the one of the field in expression.
+    """
+    low_limit = RANGES[field_name]['min']
+    high_limit = RANGES[field_name]['max']
+    if field_name != 'day_of_week':
+        # Fast paths of the most common values.
+        if field == '*':
+            return (1 << (high_limit - low_limit + 1)) - 1, NO_OPERATORS
+        if field.isdigit() and field.isascii() and (
+            low_limit <= int(field) <= high_limit
+        ):
+            return 1 << (int(field) - low_limit), NO_OPERATORS
+    names = NAMED_VALUES.get(field_name, {})
+    if expression is None:
+        expression = field
+
+    def fail(reason, offset):
+        raise CroniterSyntaxError(
+            reason.format(field[offset:].partition(',')[0]), expression,
+            field_name, position + offset
+        )
+
+    def to_value(token, offset):
+        value = int(token) if token.isdigit() else names.get(token)
+        if value is None:
+            fail('"{}" is not a valid value.', offset)
+        if not low_limit <= value <= high_limit:
+            fail('"{}" is out of range.', offset)
+        return value
+
+    def day_operator(low, high, offset):
+        # CompiledExpression field and bit of 'L', 'L-n', 'LW', 'nW', 'nL'.
+        if field_name == 'day_of_week':
+            if high is None:
+                return 'day_of_week_last', to_value(low[:-1], offset) - 1
+        elif low == 'l':
+            if high is None:
+                return 'day_of_month_last', 0
+            if high.isdigit():
+                if int(high) >= high_limit:
+                    fail('"{}" is out of range.', offset)
+                return 'day_of_month_last', int(high)
+        elif high is None:
+            if low == 'lw':
+                return 'last_workday', 0
+            if low[:-1].isdigit():
+                return 'day_of_month_nearest', to_value(low[:-1], offset) - 1
+        fail('"{}" is not a valid value.', offset)
+
+    mask = 0
+    operators = {}
+    if field_name == 'day_of_week':
+        # Weekdays running every week, and the '#' week bitmasks.
+        every_week = 0
+        day_wk = [0] * 7
+    offset = 0
+    while offset < len(field) or not offset:
+        match = FIELD_VALUE.match(field, offset)
+        if match is None:
+            if field[offset:offset + 1] in ('', ','):
+                fail('Empty value.', offset)
+            fail('"{}" is not a valid value.', offset)
+        wildcard, low, high, increment, week_low, week_high = match.groups()
+        if week_low is not None and field_name != 'day_of_week':
+            fail('"{}": "#" is only valid in day_of_week.', offset)
+
+        if wildcard == '?' and (
+            field_name not in ('day_of_month', 'day_of_week') or
+            len(field) != 1
+        ):
+            fail('"{}": "?" must be the whole day_of_month or day_of_week.',
+                 offset)
+        elif wildcard is not None:
+            first, last = low_limit, high_limit
+        elif increment is None and week_low is None and (
+            field_name == 'day_of_month' and low[0] == 'l' or
+            field_name == 'day_of_month' and low[-1] == 'w' or
+            field_name == 'day_of_week' and low != 'l' and low[-1] == 'l'
+        ):
+            # Day operators, resolved per month by CompiledExpression.
+            name, bit = day_operator(low, high, offset)
+            operators[name] = operators.get(name, 0) | 1 << bit
+            offset = match.end()
+            continue
+        else:
+            first = to_value(low, offset)
+            if high is not None:
+                last = to_value(high, offset)
+            elif increment is not None:
+                last = high_limit
+            else:
+                last = first
+            if first > last:
+                fail('"{}": the range starts after its end.', offset)
+
+        if increment is None:
+            bits = ((1 << (last - first + 1)) - 1) << (first - low_limit)
+        else:
+            increment = int(increment)
+            if not increment:
+                fail('"{}": the increment must be positive.', offset)
+            bits = 0
+            for value in range(first, last + 1, increment):
+                bits |= 1 << (value - low_limit)
+        mask |= bits
+
+        if field_name == 'day_of_week':
+            if week_low is None:
+                every_week |= bits
+            else:
+                first_week = int(week_low)
+                last_week = int(week_high or week_low)
+                if not 1 <= first_week <= last_week <= 5:
+                    fail('"{}": the week numbers must be 1 to 5.', offset)
+                weeks = ((1 << (last_week - first_week + 1)) - 1) << (
+                    first_week - 1
+                )
+                for weekday in iter_bits(bits):
+                    day_wk[weekday] |= weeks
+        offset = match.end()
+        if offset == len(field) and field[-1] == ',':
+            fail('Empty value.', offset)
+
+    if field_name == 'day_of_week':
+        operators['day_wk'] = tuple(
+            ALL_WEEKS if every_week >> weekday & 1 or not weeks else weeks
+            for weekday, weeks in enumerate(day_wk)
+        )
+    return mask, operators
+
+
+# {field_name: {field: parse_field result}} of the valid fields parsed so
+# far, most expressions repeat a few field values. Past PARSED_FIELDS_LIMIT
+# fields, new ones are parsed on every use.
+PARSED_FIELDS = dict((field_name, {}) for field_name in FIELD_NAMES)
+PARSED_FIELDS_LIMIT = 1 << 16
+
+
+def compile_fields(fields, expression=None):
+    """
+        Compiles the seven fields of a cron expression, second being None
+        in the six field form, to a CompiledExpression in a single pass.
+        Raises CroniterSyntaxError locating the offending value.
+    """
+    masks = []
+    operators = {}
+    position = 0
+    for field_name, field in zip(FIELD_NAMES, fields):
+        if field is None:
+            masks.append(1)
+            continue
+        parsed_fields = PARSED_FIELDS[field_name]
+        parsed = parsed_fields.get(field)
+        if parsed is None:
+            parsed = parse_field(field_name, field, expression, position)
+            if len(parsed_fields) < PARSED_FIELDS_LIMIT:
+                parsed_fields[field] = parsed
+        mask, field_operators = parsed
+        masks.append(mask)
+        if field_operators:
+            operators.update(field_operators)
+        position += len(field) + 1
+    return CompiledExpression(*masks, **operators)
+
+
+def expanded_field(field_name, compiled):
+    """
+        Expanded values of a field of a CompiledExpression: ['*'] when the
+        field is full, otherwise its sorted values, followed by the 'l',
+        'l-n', 'nw', 'lw' (day_of_month) or 'nl' (day_of_week) operators.
+    """
+    mask = getattr(compiled, field_name)
+    low, high = RANGES[field_name]['min'], RANGES[field_name]['max']
+    if mask == (1 << (high - low + 1)) - 1:
+        values = ['*']
+    else:
+        values = [bit + low for bit in iter_bits(mask)]
+    operators = []
+    if field_name == 'day_of_month':
+        operators.extend(
+            'l-{}'.format(offset) if offset else 'l'
+            for offset in iter_bits(compiled.day_of_month_last)
+        )
+        operators.extend(
+            '{}w'.format(day + 1)
+            for day in iter_bits(compiled.day_of_month_nearest)
+        )
+        if compiled.last_workday:
+            operators.append('lw')
+    elif field_name == 'day_of_week':
+        operators.extend(
+            '{}l'.format(weekday + 1)
+            for weekday in iter_bits(compiled.day_of_week_last)
+        )
+    return values + sorted(operators)
+
+
+def week_mask(wk_numbers):
+    """
+        Bitmask of a set of week numbers. Bit 0 is the first week.
+    """
+    mask = 0
+    for wk_number in wk_numbers:
+        mask |= 1 << (wk_number - 1)
+    return mask
+
+
+def day_wk_numbers_of(day_wk):
+    """
+        Inverse of day_wk_masks: {weekday: frozenset of week numbers} of
+        the weekdays restricted to some weeks.
+    """
+    return dict(
+        (weekday + 1, frozenset(bit + 1 for bit in iter_bits(weeks)))
+        for weekday, weeks in enumerate(day_wk) if weeks != ALL_WEEKS
+    )
+
+
+def day_wk_masks(day_wk_numbers):
+    """
+        Converts a {weekday: {week numbers}} dict to a tuple holding the
+        week number bitmask of every weekday.
+    """
+    return tuple(
+        week_mask(day_wk_numbers[weekday])
+        if weekday in day_wk_numbers else ALL_WEEKS
+        for weekday in range(1, 8)
+    )
+
+
+class CompiledExpression(namedtuple('CompiledExpression', FIELD_NAMES + [
+    'day_wk', 'day_of_month_last', 'day_of_month_nearest', 'last_workday',
+    'day_of_week_last'
+], defaults=(0, 0, 0, 0))):
+    """
+        Compiled form of a CronExpression: one bitmask per field, plus the
+        week number bitmask of every weekday for '#' expressions. The day
+        operators resolved per month have their own bitmasks: days before
+        the last one ('L', 'L-n', bit n), dates whose nearest weekday runs
+        ('nW', bit n - 1), the last weekday flag ('LW') and the weekdays
+        running on their last occurrence ('nL', bit n - 1).
+    """
+    __slots__ = ()
+
+    def to_expression(self):
+        """
+            Canonical 7 field expression of the compiled form. Expressions
+            with the same executions, however they are spelled, share it.
+        """
+        fields = [
+            field_text(field_name, getattr(self, field_name))
+            for field_name in FIELD_NAMES
         ]
+        if self.day_of_week == 0b1111111 and self.day_wk == ALL_WEEKS_DAY_WK:
+            day_of_month = [fields[3]] if self.day_of_month else []
+            day_of_month.extend(
+                'L-{}'.format(offset) if offset else 'L'
+                for offset in iter_bits(self.day_of_month_last)
+            )
+            day_of_month.extend(
+                '{}W'.format(day + 1)
+                for day in iter_bits(self.day_of_month_nearest)
+            )
+            if self.last_workday:
+                day_of_month.append('LW')
+            fields[3] = ','.join(day_of_month)
+            fields[5] = '?'
+            return ' '.join(fields)
+        every_week = 0
+        nth_weekdays = []
+        for weekday in iter_bits(self.day_of_week):
+            if self.day_wk[weekday] == ALL_WEEKS:
+                every_week |= 1 << weekday
+                continue
+            nth_weekdays.extend(
+                '{}#{}'.format(weekday + 1, wk_number + 1)
+                for wk_number in iter_bits(self.day_wk[weekday])
+            )
+        if every_week:
+            nth_weekdays.insert(0, field_text('day_of_week', every_week))
+        nth_weekdays.extend(
+            '{}L'.format(weekday + 1)
+            for weekday in iter_bits(self.day_of_week_last)
+        )
+        fields[3] = '?'
+        fields[5] = ','.join(nth_weekdays)
+        return ' '.join(fields)
 
-        if [day_of_month, day_of_week].count('?') is not 1:
-            raise CroniterBadCronError(
-                '''
-                You cannot specify a value in the day_of_month and in the
-                day_of_week fields in the same cron expression. If you specify
-                a value in one of the fields, you must use a ? (question mark)
-                in the other field.
-                '''
+    def to_bytes(self):
+        """
+            Fixed size binary record of the compiled expression, see RECORD.
+        """
+        flags = 0 if self.day_wk == ALL_WEEKS_DAY_WK else RECORD_FLAG_DAY_WK
+        if self.last_workday:
+            flags |= RECORD_FLAG_LAST_WORKDAY
+        return RECORD.pack(
+            RECORD_VERSION, flags, self.second, self.minute, self.hour,
+            self.day_of_month, self.month, self.day_of_week,
+            bytes(bytearray(self.day_wk)), self.year.to_bytes(32, 'little'),
+            self.day_of_month_last, self.day_of_month_nearest,
+            self.day_of_week_last
+        )
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """
+            Reads the record at offset of data, any object supporting the
+            buffer protocol, without copying it.
+        """
+        try:
+            (version, flags, second, minute, hour, day_of_month, month,
+             day_of_week, day_wk, year, day_of_month_last,
+             day_of_month_nearest, day_of_week_last) = RECORD.unpack_from(
+                data, offset
+            )
+        except struct.error as error:
+            raise CroniterError(
+                'Invalid compiled expression record: {}'.format(error)
+            )
+        if version != RECORD_VERSION:
+            raise CroniterError(
+                'Unsupported compiled expression record version {}.'.format(
+                    version
+                )
+            )
+        if flags & RECORD_FLAG_RATE:
+            return CompiledRate(second, minute)
+        if flags & RECORD_FLAG_DAY_WK:
+            day_wk = tuple(bytearray(day_wk))
+        else:
+            day_wk = ALL_WEEKS_DAY_WK
+        return cls(
+            second, minute, hour, day_of_month, month, day_of_week,
+            int.from_bytes(year, 'little'), day_wk, day_of_month_last,
+            day_of_month_nearest, int(bool(flags & RECORD_FLAG_LAST_WORKDAY)),
+            day_of_week_last
+        )
+
+    @property
+    def day_operators(self):
+        """
+            Whether some days are resolved per month ('L', 'W', 'nL'),
+            which fixed day bitmaps cannot index.
+        """
+        return bool(
+            self.day_of_month_last or self.day_of_month_nearest or
+            self.last_workday or self.day_of_week_last
+        )
+
+    def day_mask(self, year, month):
+        """
+            Bitmask of the days of the given month the expression runs on.
+            Bit 0 is the first of the month.
+        """
+        info = CALENDAR_TABLE.month(year, month)
+        mask = self.day_of_month & ((1 << info.length) - 1)
+        if self.day_of_month_last:
+            for offset in iter_bits(self.day_of_month_last):
+                if offset < info.length:
+                    mask |= 1 << (info.length - 1 - offset)
+        if self.day_of_month_nearest:
+            for day in iter_bits(self.day_of_month_nearest):
+                mask |= info.nearest_days[day]
+        if self.last_workday:
+            mask |= 1 << (info.last_workday - 1)
+        day_of_week = self.day_of_week
+        if day_of_week == 0b1111111 and self.day_wk == ALL_WEEKS_DAY_WK:
+            return mask
+        # Rotate the weekday bitmask so bit 0 is the weekday of the 1st.
+        shift = info.first_weekday - 1
+        pattern = (day_of_week >> shift | day_of_week << (7 - shift)) & 0x7f
+        if self.day_wk == ALL_WEEKS_DAY_WK:
+            week_days = pattern * REPEAT_WEEKS
+        else:
+            week_days = 0
+            for weekday in range(1, 8):
+                if not day_of_week >> (weekday - 1) & 1:
+                    continue
+                first = info.first_days[weekday - 1] - 1
+                wk_mask = self.day_wk[weekday - 1]
+                for wk_number in range(5):
+                    if wk_mask >> wk_number & 1:
+                        week_days |= 1 << (first + 7 * wk_number)
+        for weekday in iter_bits(self.day_of_week_last):
+            week_days |= 1 << (info.last_days[weekday] - 1)
+        return mask & week_days
+
+    def times_before(self, seconds):
+        """
+            Number of execution times in a day before the given second of
+            the day, counted from the hour, minute and second bitmasks.
+        """
+        hour, seconds = divmod(seconds, 3600)
+        minute, second = divmod(seconds, 60)
+        count = popcount(self.hour & ((1 << hour) - 1)) * (
+            popcount(self.minute) * popcount(self.second)
+        )
+        if self.hour >> hour & 1:
+            count += popcount(self.minute & ((1 << minute) - 1)) * (
+                popcount(self.second)
+            )
+            if self.minute >> minute & 1:
+                count += popcount(self.second & ((1 << second) - 1))
+        return count
+
+    def count_days(self, first_day, last_day):
+        """
+            Number of days from first_day to last_day (day numbers, both
+            inclusive) the expression runs on: month by month in the first
+            and last year, and per kind of year for the years in between.
+        """
+        if first_day > last_day:
+            return 0
+        first_year = civil_from_days(first_day)[0]
+        last_year = civil_from_days(last_day)[0]
+        if first_year == last_year:
+            return self.count_month_days(first_day, last_day)
+        count = self.count_month_days(
+            first_day, days_from_civil(first_year + 1, 1, 1) - 1
+        ) + self.count_month_days(
+            days_from_civil(last_year, 1, 1), last_day
+        )
+        year_min = RANGES['year']['min']
+        low = max(first_year + 1 - year_min, 0)
+        high = last_year - year_min
+        if low >= high:
+            return count
+        years = self.year & (((1 << high) - 1) >> low << low)
+        for sample, mask in CALENDAR_TABLE.year_kinds:
+            if years & mask:
+                count += popcount(years & mask) * self.year_days(sample)
+        return count
+
+    def year_days(self, year):
+        """
+            Number of days of year the expression runs on, whatever its
+            year field. Cached per expression and kind of year, see
+            CalendarTable.
+        """
+        key = (self, year)
+        count = YEAR_DAYS.get(key)
+        if count is None:
+            count = sum(
+                popcount(self.day_mask(year, month + 1))
+                for month in iter_bits(self.month)
+            )
+            if len(YEAR_DAYS) < YEAR_DAYS_LIMIT:
+                YEAR_DAYS[key] = count
+        return count
+
+    def count_month_days(self, first_day, last_day):
+        """
+            count_days, one popcount per month.
+        """
+        year, month, day = civil_from_days(first_day)
+        last_year, last_month, last_date = civil_from_days(last_day)
+        year_min = RANGES['year']['min']
+        count = 0
+        while (year, month) <= (last_year, last_month):
+            found = next_bit(self.year, year - year_min)
+            if found < 0 or found + year_min > last_year:
+                break
+            if found + year_min != year:
+                year, month, day = found + year_min, 1, 1
+                continue
+            found = next_bit(self.month, month - 1)
+            if found < 0:
+                year, month, day = year + 1, 1, 1
+                continue
+            if found + 1 != month:
+                month, day = found + 1, 1
+                continue
+            mask = self.day_mask(year, month) >> (day - 1) << (day - 1)
+            if (year, month) == (last_year, last_month):
+                mask &= (1 << last_date) - 1
+            count += popcount(mask)
+            month, day = month + 1, 1
+        return count
+
+    def count_between(self, epoch_1, epoch_2):
+        """
+            Number of execution times from epoch_1 to epoch_2, both
+            inclusive, without enumerating them: matching days times
+            executions per day, corrected on the first and last day.
+        """
+        if epoch_1 > epoch_2:
+            return 0
+        day_1, seconds_1 = divmod(epoch_1, 86400)
+        day_2, seconds_2 = divmod(epoch_2, 86400)
+        per_day = (
+            popcount(self.hour) * popcount(self.minute) *
+            popcount(self.second)
+        )
+        if day_1 == day_2:
+            if not self.count_days(day_1, day_1):
+                return 0
+            return (
+                self.times_before(seconds_2 + 1) -
+                self.times_before(seconds_1)
+            )
+        count = self.count_days(day_1 + 1, day_2 - 1) * per_day
+        if self.count_days(day_1, day_1):
+            count += per_day - self.times_before(seconds_1)
+        if self.count_days(day_2, day_2):
+            count += self.times_before(seconds_2 + 1)
+        return count
+
+    def time_offsets(self):
+        """
+            Sorted seconds of the day the expression runs at.
+        """
+        return [
+            hour * 3600 + minute * 60 + second
+            for hour in iter_bits(self.hour)
+            for minute in iter_bits(self.minute)
+            for second in iter_bits(self.second)
+        ]
+
+    def iter_epochs(self, first, last):
+        """
+            Yields the execution times from first to last (epoch seconds,
+            both inclusive), day by day.
+        """
+        offsets = self.time_offsets()
+        for day in self.iter_days(first // 86400):
+            base = day * 86400
+            if base > last:
+                return
+            for offset in offsets:
+                epoch = base + offset
+                if epoch > last:
+                    return
+                if epoch >= first:
+                    yield epoch
+
+    def iter_days(self, days):
+        """
+            Yields the day numbers the expression runs on, starting at the
+            given day number, month by month over the day bitmasks.
+        """
+        year, month, day = civil_from_days(days)
+        year_min = RANGES['year']['min']
+        while True:
+            found = next_bit(self.year, year - year_min)
+            if found < 0:
+                return
+            if found + year_min != year:
+                year, month, day = found + year_min, 1, 1
+
+            found = next_bit(self.month, month - 1)
+            if found < 0:
+                year, month, day = year + 1, 1, 1
+                continue
+            if found + 1 != month:
+                month, day = found + 1, 1
+
+            first = CALENDAR_TABLE.month(year, month).start
+            mask = self.day_mask(year, month) >> (day - 1) << (day - 1)
+            while mask:
+                low = mask & -mask
+                yield first + low.bit_length() - 1
+                mask ^= low
+            month, day = month + 1, 1
+
+    def next_epoch(self, epoch, is_prev=False):
+        """
+            First execution time at or after epoch, or the last one at or
+            before it when is_prev is set. Walks field by field over the
+            bitmasks, from year down to second. A field that runs out
+            carries into its parent field and the walk resumes there.
+        """
+        days, seconds = divmod(int(epoch), 86400)
+        year, month, day = civil_from_days(days)
+        hour, seconds = divmod(seconds, 3600)
+        minute, second = divmod(seconds, 60)
+        year_min = RANGES['year']['min']
+
+        if is_prev:
+            find, reset = prev_bit, (12, 31, 23, 59, 59)
+            step = -1
+        else:
+            find, reset = next_bit, (1, 1, 0, 0, 0)
+            step = 1
+
+        level = 0
+        while True:
+            if level <= 0:
+                found = find(self.year, year - year_min)
+                if found < 0:
+                    raise CroniterBadDateError(
+                        'failed to find {} date'.format(
+                            'prev' if is_prev else 'next'
+                        )
+                    )
+                if found + year_min != year:
+                    year = found + year_min
+                    month, day, hour, minute, second = reset
+
+            if level <= 1:
+                found = find(self.month, month - 1)
+                if found < 0:
+                    year += step
+                    month, day, hour, minute, second = reset
+                    level = 0
+                    continue
+                if found + 1 != month:
+                    month = found + 1
+                    day, hour, minute, second = reset[1:]
+                day_mask = self.day_mask(year, month)
+                if is_prev:
+                    day = min(day, CALENDAR_TABLE.month(year, month).length)
+
+            if level <= 2:
+                found = find(day_mask, day - 1)
+                if found < 0:
+                    month += step
+                    day, hour, minute, second = reset[1:]
+                    level = 1
+                    continue
+                if found + 1 != day:
+                    day = found + 1
+                    hour, minute, second = reset[2:]
+
+            if level <= 3:
+                found = find(self.hour, hour)
+                if found < 0:
+                    day += step
+                    hour, minute, second = reset[2:]
+                    level = 2
+                    continue
+                if found != hour:
+                    hour = found
+                    minute, second = reset[3:]
+
+            if level <= 4:
+                found = find(self.minute, minute)
+                if found < 0:
+                    hour += step
+                    minute, second = reset[3:]
+                    level = 3
+                    continue
+                if found != minute:
+                    minute = found
+                    second = reset[4]
+
+            found = find(self.second, second)
+            if found < 0:
+                minute += step
+                second = reset[4]
+                level = 4
+                continue
+
+            return (
+                (CALENDAR_TABLE.month(year, month).start + day - 1) * 86400 +
+                hour * 3600 + minute * 60 + found
             )
 
-        self.expanded_expression, self.day_wk_numbers =\
-            self.expand(self.fields)
+
+class CompiledRate(namedtuple('CompiledRate', ['period', 'anchor'])):
+    """
+        Compiled form of a RateExpression: it runs every period seconds
+        from the anchor epoch, up to the end of the supported year range.
+        Execution times are computed with modular arithmetic from the
+        anchor, behind the methods of CompiledExpression.
+    """
+    __slots__ = ()
+
+    def next_epoch(self, epoch, is_prev=False):
+        """
+            First execution time at or after epoch, or the last one at or
+            before it when is_prev is set.
+        """
+        epoch = int(epoch)
+        if is_prev:
+            epoch = min(epoch, EPOCH_MAX)
+            found = epoch - (epoch - self.anchor) % self.period
+            if found < self.anchor:
+                raise CroniterBadDateError('No execution before the anchor.')
+            return found
+        epoch = max(epoch, self.anchor)
+        found = epoch + (self.anchor - epoch) % self.period
+        if found > EPOCH_MAX:
+            raise CroniterBadDateError('No execution after the year range.')
+        return found
+
+    def count_between(self, epoch_1, epoch_2):
+        """
+            Number of execution times from epoch_1 to epoch_2, both
+            inclusive.
+        """
+        epoch_1 = max(epoch_1, self.anchor)
+        epoch_2 = min(epoch_2, EPOCH_MAX)
+        if epoch_1 > epoch_2:
+            return 0
+        return max(
+            0, (epoch_2 - self.anchor) // self.period -
+            -(-(epoch_1 - self.anchor) // self.period) + 1
+        )
+
+    def iter_epochs(self, first, last):
+        """
+            Yields the execution times from first to last (epoch seconds,
+            both inclusive).
+        """
+        try:
+            first = self.next_epoch(first)
+        except CroniterBadDateError:
+            return iter(())
+        return iter(range(first, min(last, EPOCH_MAX) + 1, self.period))
+
+    def matches(self, epoch):
+        return self.anchor <= epoch <= EPOCH_MAX and (
+            (epoch - self.anchor) % self.period == 0
+        )
+
+    def to_expression(self):
+        """
+            Canonical rate expression of the period, in its largest unit.
+            The anchor is not part of the text.
+        """
+        for unit, seconds in sorted(
+            RATE_UNITS.items(), key=lambda item: -item[1]
+        ):
+            if self.period % seconds == 0:
+                value = self.period // seconds
+                return 'rate({} {}{})'.format(
+                    value, unit, '' if value == 1 else 's'
+                )
+
+    def to_bytes(self):
+        """
+            RECORD of the rate, flagged with RECORD_FLAG_RATE.
+        """
+        return RECORD.pack(
+            RECORD_VERSION, RECORD_FLAG_RATE, self.period, self.anchor,
+            0, 0, 0, 0, bytes(7), bytes(32), 0, 0, 0
+        )
+
+
+class ZonedExpression(namedtuple('ZonedExpression', ['compiled', 'zone'])):
+    """
+        A compiled expression evaluated in the local time of a ZoneTable,
+        with the execution time methods of CompiledExpression on UTC epochs.
+    """
+    __slots__ = ()
+
+    def next_epoch(self, epoch, is_prev=False):
+        return self.zone.next_epoch(self.compiled, epoch, is_prev)
+
+    def count_between(self, epoch_1, epoch_2):
+        return self.zone.count_between(self.compiled, epoch_1, epoch_2)
+
+    def iter_epochs(self, first, last):
+        return self.zone.iter_epochs(self.compiled, first, last)
+
+
+def pack_many(compiled_expressions):
+    """
+        Packs compiled expressions into one buffer: a header followed by
+        their records in order. Written to a file, the buffer can be
+        memory-mapped and read in place with unpack_record.
+    """
+    records = [compiled.to_bytes() for compiled in compiled_expressions]
+    return RECORD_HEADER.pack(
+        RECORD_MAGIC, RECORD_VERSION, RECORD.size, len(records)
+    ) + b''.join(records)
+
+
+def record_count(buffer):
+    """
+        Number of records of a pack_many buffer, checking its header.
+    """
+    try:
+        magic, version, size, count = RECORD_HEADER.unpack_from(buffer)
+    except struct.error:
+        raise CroniterError('Buffer is too short for a record header.')
+    if magic != RECORD_MAGIC:
+        raise CroniterError('Buffer does not hold packed records.')
+    if version != RECORD_VERSION or size != RECORD.size:
+        raise CroniterError(
+            'Unsupported record version {} of size {}.'.format(version, size)
+        )
+    if len(buffer) < RECORD_HEADER.size + count * size:
+        raise CroniterError('Buffer is truncated.')
+    return count
+
+
+def unpack_record(buffer, index):
+    """
+        The compiled expression at index of a pack_many buffer.
+    """
+    return CompiledExpression.from_bytes(
+        buffer, RECORD_HEADER.size + index * RECORD.size
+    )
+
+
+def unpack_many(buffer):
+    """
+        Lazily yields the compiled expressions of a pack_many buffer.
+    """
+    for index in range(record_count(buffer)):
+        yield unpack_record(buffer, index)
+
+
+# Values shared by equal parsed expressions, see intern_shared.
+SHARED_VALUES = {}
+SHARED_VALUES_LIMIT = 1 << 16
+NO_DAY_WK_NUMBERS = MappingProxyType({})
+
+
+def intern_shared(value):
+    """
+        Returns the shared instance equal to value, so many expressions
+        using the same field values hold a single copy of them. Values past
+        SHARED_VALUES_LIMIT distinct ones are returned as is.
+    """
+    key = type(value), value
+    shared = SHARED_VALUES.get(key)
+    if shared is not None:
+        return shared
+    if len(SHARED_VALUES) < SHARED_VALUES_LIMIT:
+        SHARED_VALUES[key] = value
+    return value
+
+
+class CronExpression(object):
+    bad_length = 'Cron expression should be 6 or 7 fields, not {}.'
+
+    __slots__ = ('expression', 'fields', 'compiled')
+
+    def __init__(self, expression):
+        set_attr = super(CronExpression, self).__setattr__
+        set_attr('expression', normalize_expression(expression))
+        set_attr('fields', self.split_fields(self.expression))
+        set_attr('compiled', intern_shared(
+            compile_fields(self.fields, self.expression)
+        ))
         return None
 
+    def __setattr__(self, name, value):
+        raise AttributeError('CronExpression objects are immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError('CronExpression objects are immutable.')
+
+    def __reduce__(self):
+        return self.__class__, (self.expression,)
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.expression)
+
+    @property
+    def expanded_expression(self):
+        """
+            Expanded values of every field, see expanded_field.
+        """
+        return tuple(
+            tuple(expanded_field(field_name, self.compiled))
+            for field_name in FIELD_NAMES
+        )
+
+    @property
+    def day_wk_numbers(self):
+        """
+            Read-only {weekday: frozenset of week numbers} of the weekdays
+            restricted to some weeks with '#'.
+        """
+        if self.compiled.day_wk == ALL_WEEKS_DAY_WK:
+            return NO_DAY_WK_NUMBERS
+        return MappingProxyType(day_wk_numbers_of(self.compiled.day_wk))
+
+    @property
+    def canonical_key(self):
+        """
+            Hashable key equal for all the expressions with the same
+            executions: the compiled bitmasks of the expanded fields.
+        """
+        return self.compiled
+
+    @property
+    def canonical_expression(self):
+        return self.compiled.to_expression()
+
+    @classmethod
+    def from_cache(cls, expression):
+        """
+            Returns the shared CronExpression of the expression from
+            EXPRESSION_CACHE, parsing it on a miss.
+        """
+        return EXPRESSION_CACHE.get(expression)
+
+    @classmethod
+    def split_fields(cls, expression):
+        """
+            The seven fields of a normalized expression, second being None
+            in the six field form. Checks the field count and that exactly
+            one of the day fields is '?'.
+        """
+        fields = [sys.intern(field) for field in expression.split(' ')]
+        if len(fields) == 6:
+            fields.insert(0, None)
+        elif len(fields) != 7:
+            # The first extra field, or the end of a too short expression.
+            if len(fields) > 7:
+                position = len(' '.join(fields[:7])) + 1
+            else:
+                position = len(expression)
+            raise CroniterSyntaxError(
+                cls.bad_length.format(len(fields)), expression, None,
+                position
+            )
+        if (fields[3] == '?') == (fields[5] == '?'):
+            position = len(' '.join(
+                field for field in fields[:5] if field is not None
+            )) + 1
+            raise CroniterSyntaxError(
+                'Exactly one of day_of_month and day_of_week must be ? '
+                '(question mark).', expression, 'day_of_week', position
+            )
+        return tuple(fields)
+
     @classmethod
     def expand(self, fields):
         """
@@ -90,89 +1463,32 @@ class CronExpression(object):
     @classmethod
     def expand_field(self, field_name, field):
         """
-            Expands the provided field
+            Expands the provided field, see parse_field and expanded_field.
         """
         if field is None:
             return [0], {}
-
-        field_execution_times = []
-
-        values = field.split(',')
-        for value in values:
-            try:
-                value_execution_times, day_wk_numbers =\
-                    self.expand_value(field_name, value)
-                field_execution_times += value_execution_times
-            except CroniterBadCronError:
-                print('"{}" is not a valid field value.'.format(field))
-
-        field_execution_times.sort()
-        return field_execution_times, day_wk_numbers
+        mask, operators = parse_field(field_name, field.lower())
+        values = dict.fromkeys(CompiledExpression._fields, 0)
+        values['day_wk'] = ALL_WEEKS_DAY_WK
+        values.update(operators)
+        values[field_name] = mask
+        compiled = CompiledExpression(**values)
+        return (
+            expanded_field(field_name, compiled),
+            day_wk_numbers_of(compiled.day_wk)
+        )
 
     @classmethod
     def expand_value(self, field_name, value):
         """
-            Recursive boi
+            Expands a single value of a field.
         """
-        # Convert month or day names to their corresponding integers
-        value = self.calendar_to_num(field_name, value)
-        day_wk_numbers = {}
-
-        if field_name == 'day_of_week':
-            if '#' in value:
-                value, pound, wk_numbers = value.partition('#')
-                expanded_value, tmp = self.expand_value('', value)
-                expanded_wk_numbers, tmp = self.expand_value('', wk_numbers)
-                for day in expanded_value:
-                    if day not in day_wk_numbers:
-                        day_wk_numbers[day] = set()
-                    for wk_number in expanded_wk_numbers:
-                        day_wk_numbers[day].add(int(wk_number))
-
-        # If we have an increment but not a range
-        if '/' in value:
-            value, slash, increment = value.partition('/')
-            if '-' not in value:
-                # Translate to a range.
-                value = self.convert_to_range(value, field_name)
-            low, high = value.split('-')
-            low, high, increment = map(int, [low, high, increment])
-            return list(range(low, high+1, increment)), day_wk_numbers
-
-        # If we just have a range:
-        elif '-' in value:
-            low, high = value.split('-')
-            low, high = map(int, [low, high])
-            return list(range(low, high+1)), day_wk_numbers
-
-        # If we just have a number
-        elif value.isdigit():
-            return [int(value)], day_wk_numbers
-
-        # If we have l
-        elif value.lower() == 'l':
-            return [RANGES[field_name]['max']], day_wk_numbers
-
-        # If we have * or ?
-        elif value in ['*', '?']:
-            return '*', day_wk_numbers
-
-        # We dont recognise this input
-        else:
-            raise CroniterBadCronError
-
-    @classmethod
-    def convert_to_range(self, value, field_name):
-        if value == '*':
-            return '{}-{}'.format(
-                RANGES[field_name]['min'],
-                RANGES[field_name]['max']
-            )
-        elif int(value):
-            return '{}-{}'.format(
-                value,
-                RANGES[field_name]['max']
+        if ',' in value:
+            raise CroniterSyntaxError(
+                '"{}" is not a single value.'.format(value), value,
+                field_name, value.index(',')
             )
+        return self.expand_field(field_name, value)
 
     @classmethod
     def calendar_to_num(self, field_name, value):
@@ -181,113 +1497,394 @@ class CronExpression(object):
         if '#' in value:
             value, pound, wk_numbers = value.partition('#')
 
-        if field_name in ['month', 'day_of_week']:
+        if field_name in NAMED_VALUES:
             value, slash, increment = value.partition('/')
             low, dash, high = value.partition('-')
-            low = low.lower()
-            high = high.lower()
-
-            if low in list(self.CALENDAR.keys()):
-                low = self.CALENDAR[low]
-            if high in list(self.CALENDAR.keys()):
-                high = self.CALENDAR[high]
-
-            low, high = map(str, [low, high])
+            names = NAMED_VALUES[field_name]
+            low = str(names.get(low.lower(), low))
+            high = str(names.get(high.lower(), high))
             return low+dash+high+slash+increment+pound+wk_numbers
         else:
             return value
 
 
+class RateExpression(object):
+    """
+        AWS rate expression, 'rate(value unit)' with unit minute(s),
+        hour(s) or day(s). It runs every value units from the anchor (a
+        datetime or epoch, the UNIX epoch by default) onwards.
+    """
+
+    __slots__ = ('expression', 'value', 'unit', 'anchor', 'compiled')
+
+    def __init__(self, expression, anchor=0):
+        set_attr = super(RateExpression, self).__setattr__
+        set_attr('expression', normalize_expression(expression))
+        match = RATE_PATTERN.match(self.expression)
+        if match is None:
+            raise CroniterBadCronError(
+                '{} is not a rate expression.'.format(self.expression)
+            )
+        value, unit, plural = match.groups()
+        value = int(value)
+        if value < 1:
+            raise CroniterBadCronError('The rate value must be positive.')
+        if (value == 1) == bool(plural):
+            raise CroniterBadCronError(
+                'The unit must be singular for a value of 1 and plural '
+                'otherwise, not {}.'.format(self.expression)
+            )
+        if isinstance(anchor, datetime.datetime):
+            anchor = Croniter.datetime_to_timestamp(anchor)
+        anchor = -int(-anchor // 1)
+        if not 0 <= anchor <= EPOCH_MAX:
+            raise CroniterBadDateError(
+                'The anchor is outside the supported year range.'
+            )
+        set_attr('value', value)
+        set_attr('unit', unit)
+        set_attr('anchor', anchor)
+        set_attr('compiled', intern_shared(
+            CompiledRate(value * RATE_UNITS[unit], anchor)
+        ))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('RateExpression objects are immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError('RateExpression objects are immutable.')
+
+    def __reduce__(self):
+        return self.__class__, (self.expression, self.anchor)
+
+    def __repr__(self):
+        return '{}({!r}, anchor={})'.format(
+            self.__class__.__name__, self.expression, self.anchor
+        )
+
+    @property
+    def canonical_key(self):
+        """
+            Hashable key equal for all the rates with the same period and
+            anchor.
+        """
+        return self.compiled
+
+    @property
+    def canonical_expression(self):
+        return self.compiled.to_expression()
+
+    @classmethod
+    def from_cache(cls, expression):
+        return EXPRESSION_CACHE.get(expression)
+
+
+def parse_expression(expression):
+    """
+        Parses a cron or rate expression, with or without the 'cron(...)'
+        wrapper of AWS schedules, into a CronExpression or RateExpression.
+    """
+    expression = normalize_expression(expression)
+    if expression.startswith('rate('):
+        return RateExpression(expression)
+    return CronExpression(unwrap_cron(expression))
+
+
+def unwrap_cron(expression):
+    """
+        Normalized expression without its 'cron(...)' wrapper, if any.
+    """
+    if expression.startswith('cron(') and expression.endswith(')'):
+        return normalize_expression(expression[5:-1])
+    return expression
+
+
+def validate_expression(expression):
+    """
+        None when parse_expression accepts the expression, otherwise the
+        CroniterError it raises, without its traceback. Cron expressions
+        are only compiled: nothing is interned or cached but their fields,
+        in the bounded PARSED_FIELDS.
+    """
+    if not isinstance(expression, str):
+        return CroniterBadCronError(
+            '{!r} is not an expression string.'.format(expression)
+        )
+    try:
+        expression = normalize_expression(expression)
+        if expression.startswith('rate('):
+            RateExpression(expression)
+        else:
+            expression = unwrap_cron(expression)
+            compile_fields(
+                CronExpression.split_fields(expression), expression
+            )
+    except CroniterError as error:
+        return error.with_traceback(None)
+    return None
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class ExpressionCache(object):
+    """
+        Bounded, thread-safe LRU cache of parsed expressions (see
+        parse_expression) keyed by their normalized expression text.
+    """
+
+    def __init__(self, maxsize=4096):
+        self._lock = threading.Lock()
+        self._expressions = OrderedDict()
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize):
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def get(self, expression):
+        key = normalize_expression(expression)
+        with self._lock:
+            obj_expression = self._expressions.get(key)
+            if obj_expression is not None:
+                self._expressions.move_to_end(key)
+                self.hits += 1
+                return obj_expression
+            self.misses += 1
+
+        # Parse outside the lock, invalid expressions are not cached.
+        obj_expression = parse_expression(key)
+        with self._lock:
+            obj_expression = self._expressions.setdefault(
+                key, obj_expression
+            )
+            self._evict()
+        return obj_expression
+
+    def clear(self):
+        with self._lock:
+            self._expressions.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self._maxsize, len(self._expressions)
+            )
+
+    def __len__(self):
+        return len(self._expressions)
+
+    def __contains__(self, expression):
+        return normalize_expression(expression) in self._expressions
+
+    def _evict(self):
+        while len(self._expressions) > self._maxsize:
+            self._expressions.popitem(last=False)
+
+
+EXPRESSION_CACHE = ExpressionCache()
+
+
 class Croniter(object):
-    DAYS = (
-        31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31
-    )
+    """
+        Iterates over the execution times of obj_expression. Its fields
+        are UTC times, or local times of tz (an IANA zone name or tzinfo)
+        when given. Naive datetimes passed in are then local times of tz
+        too (see ZoneTable.utc_epoch), and datetimes are returned in tz.
+    """
+    DAYS = DAYS
 
-    def __init__(self, obj_expression, start_time=None):
-        self.start_time = start_time
+    __slots__ = ('obj_expression', 'cur', '_ret_type', '_zone')
+
+    def __init__(self, obj_expression, start_time=None, ret_type=float,
+                 tz=None):
         self.obj_expression = obj_expression
+        self._ret_type = ret_type
+        self._zone = None if tz is None else ZONE_TABLES.get(tz)
 
-        # Set start time to now
-        if self.start_time is None:
-            self.start_time = time()
+        # Start from now by default
+        if start_time is None:
+            start_time = time()
+        elif isinstance(start_time, datetime.datetime):
+            start_time = self.to_timestamp(start_time)
 
-    def executes_between(self, date_1, date_2):
-        datetime_field_names = [
-            'year', 'day_of_week', 'month', 'day_of_month', 'hour', 'minute',
-            'second'
-        ]
-        cron_field_names = [
-            'second', 'minute', 'hour', 'day_of_month', 'month', 'day_of_week',
-            'year'
-        ]
-        date_1 = self.split_date(date_1)
-        date_2 = self.split_date(date_2)
+        self.cur = start_time
 
-        for field_name, d_1, d_2 in zip(datetime_field_names, date_1, date_2):
-            execution_times = self.obj_expression.expanded_expression[
-                cron_field_names.index(field_name)
-            ]
+    def get_next(self, ret_type=None):
+        return self._get_next(ret_type or self._ret_type, is_prev=False)
 
-            # If * then it always executes
-            if execution_times == ['*']:
-                continue
+    def get_prev(self, ret_type=None):
+        return self._get_next(ret_type or self._ret_type, is_prev=True)
 
-            # If day_of_week# then compare cron execution days
-            # with range execution days.
-            elif(
-                field_name == 'day_of_week' and
-                self.obj_expression.day_wk_numbers != {}
-            ):
-                range_day_wk_numbers =\
-                    self.range_day_wk_numbers(date_1, date_2)
-                cron_day_wk_numbers = self.obj_expression.day_wk_numbers
-
-                for weekday in set(range_day_wk_numbers).intersection(
-                    set(cron_day_wk_numbers)
-                ):
-                    if not self.common_element(
-                        cron_day_wk_numbers[weekday],
-                        range_day_wk_numbers[weekday]
-                    ):
-                        return False
-
-            # Else compare cron execution times with range times.
-            else:
-                d_1, d_2 = map(int, [d_1, d_2])
-                d_range = [d_1 % RANGES[field_name]['max']]
-
-                # Cycle from d_1 to d_2
-                while(
-                    d_1 % RANGES[field_name]['max'] !=
-                    d_2 % RANGES[field_name]['max']
-                ):
-                    d_1 = d_1+1
-                    if d_1 % RANGES[field_name]['max'] == 0:
-                        d_range.append(RANGES[field_name]['max'])
-                    else:
-                        d_range.append(d_1 % RANGES[field_name]['max'])
-
-                # If the cron job has no execution time within this range
-                if not self.common_element(execution_times, d_range):
-                    return False
-        # All cron fields have at least 1 execution time within this range
-        return True
-
-    def range_day_wk_numbers(self, date_1, date_2):
-        day_wk_numbers = {}
-        date_1 = datetime.datetime(date_1[0], date_1[2], date_1[3])
-        date_2 = datetime.datetime(date_2[0], date_2[2], date_2[3])
-        for date in self.daterange(date_1, date_2):
-            weekday = (date.isoweekday() % 7) + 1
-            if weekday not in day_wk_numbers:
-                day_wk_numbers[weekday] = set()
-            day_wk_numbers[weekday].add(int(math.ceil(float(date.day)/7)))
-        # print(day_wk_numbers)
-        return day_wk_numbers
-
-    def daterange(self, start_date, end_date):
-        for n in range(int((end_date - start_date).days)+1):
-            yield start_date + timedelta(n)
+    def get_current(self, ret_type=None):
+        return self._convert(self.cur, ret_type or self._ret_type)
+
+    def __iter__(self):
+        return self
+    __next__ = next = get_next
+
+    def _get_next(self, ret_type, is_prev):
+        if not issubclass(ret_type, (float, datetime.datetime)):
+            raise TypeError("Invalid ret_type, only 'float' or 'datetime' "
+                            "is acceptable.")
+        # Occurrences are whole seconds strictly after (before) cur.
+        if is_prev:
+            epoch = -int(-self.cur // 1) - 1
+        else:
+            epoch = int(self.cur // 1) + 1
+        self.cur = float(self.compiled.next_epoch(epoch, is_prev))
+        return self._convert(self.cur, ret_type)
+
+    @property
+    def compiled(self):
+        """
+            The compiled expression, in the local time of tz if any.
+        """
+        compiled = self.obj_expression.compiled
+        # Rates run every period whatever the local time.
+        if self._zone is None or isinstance(compiled, CompiledRate):
+            return compiled
+        return ZonedExpression(compiled, self._zone)
+
+    def count_between(self, date_1, date_2):
+        """
+            Number of execution times between date_1 and date_2, both
+            inclusive.
+        """
+        epoch_1 = self.to_timestamp(date_1)
+        epoch_2 = self.to_timestamp(date_2)
+        return self.compiled.count_between(
+            -int(-epoch_1 // 1), int(epoch_2 // 1)
+        )
+
+    def iter_chunks(self, start, end, chunk_size=1000, cursor=None):
+        """
+            Lazily yields (chunk, cursor) pairs: lists of up to chunk_size
+            execution times (epoch seconds) between start and end, both
+            inclusive. Passing a yielded cursor back, with the same start
+            and end, resumes right after its chunk. The cursor of the last
+            chunk is None.
+        """
+        first = -int(-self.to_timestamp(start) // 1)
+        last = int(self.to_timestamp(end) // 1)
+        if cursor is not None:
+            first = max(first, self.decode_cursor(cursor))
+        epochs = self.compiled.iter_epochs(first, last)
+        chunk = list(islice(epochs, chunk_size))
+        while chunk:
+            following = next(epochs, None)
+            if following is None:
+                yield chunk, None
+                return
+            yield chunk, self.encode_cursor(following)
+            chunk = [following]
+            chunk.extend(islice(epochs, chunk_size - 1))
+
+    @classmethod
+    def encode_cursor(cls, epoch):
+        return base64.urlsafe_b64encode(
+            '{}:{}'.format(CURSOR_VERSION, epoch).encode('ascii')
+        ).decode('ascii')
+
+    @classmethod
+    def decode_cursor(cls, cursor):
+        try:
+            version, epoch = base64.urlsafe_b64decode(
+                cursor.encode('ascii')
+            ).decode('ascii').split(':')
+            if int(version) != CURSOR_VERSION:
+                raise ValueError(version)
+            return int(epoch)
+        except (AttributeError, TypeError, ValueError):
+            raise CroniterError('{!r} is not a valid cursor.'.format(cursor))
+
+    def occurrences(self, start, end=None, count=None):
+        """
+            Execution times from start onwards as a NumPy int64 array of
+            epoch seconds: up to end (inclusive), or the first count ones.
+        """
+        from .vectorized import occurrences_array, zoned_occurrences
+
+        if (end is None) == (count is None):
+            raise TypeError('Pass exactly one of end or count.')
+        if isinstance(start, datetime.datetime):
+            start = self.to_timestamp(start)
+        if isinstance(end, datetime.datetime):
+            end = self.to_timestamp(end)
+        compiled = self.compiled
+        if isinstance(compiled, ZonedExpression):
+            occurrences = zoned_occurrences
+        else:
+            occurrences = occurrences_array
+        return occurrences(
+            compiled, -int(-start // 1),
+            None if end is None else int(end // 1), count
+        )
+
+    def _convert(self, timestamp, ret_type):
+        if issubclass(ret_type, datetime.datetime):
+            if self._zone is not None:
+                return datetime.datetime.fromtimestamp(
+                    timestamp, self._zone.tzinfo
+                )
+            return self.timestamp_to_datetime(timestamp)
+        return timestamp
+
+    def to_timestamp(self, date):
+        """
+            Converts a datetime to a UNIX timestamp. Naive datetimes are
+            local times of tz if any, UTC otherwise.
+        """
+        timestamp = self.datetime_to_timestamp(date)
+        if self._zone is not None and date.tzinfo is None:
+            return self._zone.utc_epoch(timestamp)
+        return timestamp
+
+    @classmethod
+    def datetime_to_timestamp(cls, date):
+        """
+            Converts a datetime to a UNIX timestamp. Naive datetimes are UTC.
+        """
+        if date.tzinfo is not None:
+            date = date.replace(tzinfo=None) - date.utcoffset()
+        return (
+            days_from_civil(date.year, date.month, date.day) * 86400 +
+            date.hour * 3600 + date.minute * 60 + date.second +
+            date.microsecond / 10.0**6
+        )
+
+    @classmethod
+    def timestamp_to_datetime(cls, timestamp):
+        """
+            Converts a UNIX timestamp to a naive UTC datetime.
+        """
+        return EPOCH + timedelta(seconds=timestamp)
+
+    def executes_between(self, date_1, date_2):
+        """
+            Whether the expression runs between date_1 and date_2, both
+            inclusive: the first execution time at or after date_1 must not
+            be later than date_2.
+        """
+        epoch_1 = self.to_timestamp(date_1)
+        epoch_2 = self.to_timestamp(date_2)
+        if epoch_1 > epoch_2:
+            return False
+        try:
+            next_epoch = self.compiled.next_epoch(-int(-epoch_1 // 1))
+        except CroniterBadDateError:
+            return False
+        return next_epoch <= epoch_2
 
     def split_date(self, date):
         return [
@@ -299,6 +1896,3 @@ class Croniter(object):
             date.minute,
             date.second
         ]
-
-    def common_element(self, list_1, list_2):
-        return any(True for element in list_1 if element in list_2)
@@ -5,9 +5,18 @@ from __future__ import absolute_import, print_function
 import re
 from time import time
 import datetime
-from dateutil.relativedelta import relativedelta
-from dateutil.tz import tzutc
-import calendar
+
+from . import aws_croniter
+
+try:
+    from dateutil.relativedelta import relativedelta
+    from dateutil.tz import tzutc
+except ImportError:
+    # dateutil is only needed by the datetime engine (non-UTC timezones).
+    relativedelta = None
+
+    def tzutc():
+        return datetime.timezone.utc
 
 step_search_re = re.compile(r'^([^-]+)-([^-/]+)(/(.*))?$')
 search_re = re.compile(r'^([^-]+)-([^-/]+)(/(.*))?$')
@@ -16,6 +25,13 @@ any_int_re = re.compile(r'^\d+')
 star_or_int_re = re.compile(r'^(\d+|\*)$')
 VALID_LEN_EXPRESSION = [5, 6]
 
+# Timestamps the integer epoch engine supports (aws_croniter year range).
+EPOCH_ENGINE_RANGE = (
+    0,
+    aws_croniter.days_from_civil(
+        aws_croniter.RANGES['year']['max'] + 1, 1, 1) * 86400
+)
+
 
 class CroniterError(ValueError):
     pass
@@ -85,9 +101,90 @@ class croniter(object):
         self.start_time = start_time
         self.cur = start_time
 
-        self.expanded, self.nth_weekday_of_month = self.expand(expr_format)
-        print(expr_format)
-        print(self.expanded)
+        expanded, nth_weekday_of_month = self.expand(expr_format)
+        # The expansion is never mutated while iterating, so _get_next can
+        # use it without copying.
+        self.expanded = tuple(tuple(field) for field in expanded)
+        self.nth_weekday_of_month = self._normalize_nth_weekday_of_month(
+            nth_weekday_of_month)
+        self._compiled = None
+        if self._is_utc(self.tzinfo):
+            self._compiled = self._compile(
+                self.expanded, self.nth_weekday_of_month, day_or)
+
+    @classmethod
+    def _is_utc(cls, tzinfo):
+        return (
+            tzinfo is None or
+            tzinfo.utcoffset(None) == datetime.timedelta(0) and
+            tzinfo.dst(None) in (None, datetime.timedelta(0)) and
+            tzinfo.tzname(None) == 'UTC'
+        )
+
+    @classmethod
+    def _compile(cls, expanded, nth_weekday_of_month, day_or):
+        """
+        Compiles the expansion to aws_croniter bitmasks for the integer
+        epoch engine. Returns the compiled expressions whose earliest (or
+        latest) execution time wins, or None when only the datetime engine
+        handles the expansion.
+        """
+        day_restricted = (
+            expanded[2][0] != '*' and
+            (expanded[4][0] != '*' or nth_weekday_of_month))
+        if day_restricted and day_or and nth_weekday_of_month:
+            return None
+
+        def mask(values, low, size):
+            if values[0] == '*':
+                return (1 << size) - 1
+            result = 0
+            for value in values:
+                if value != 'l':
+                    result |= 1 << (value - low)
+            return result
+
+        # croniter weekdays are 0-6 from Sunday, aws_croniter ones 1-7.
+        if nth_weekday_of_month:
+            day_of_week = mask(sorted(nth_weekday_of_month), 0, 7)
+        else:
+            day_of_week = mask(expanded[4], 0, 7)
+        compiled = aws_croniter.CompiledExpression(
+            second=mask(expanded[5], 0, 60) if len(expanded) == 6 else 1,
+            minute=mask(expanded[0], 0, 60),
+            hour=mask(expanded[1], 0, 24),
+            day_of_month=mask(expanded[2], 1, 31),
+            # 'l' is the last day of the month, the 'L' operator.
+            day_of_month_last=int('l' in expanded[2]),
+            month=mask(expanded[3], 1, 12),
+            day_of_week=day_of_week,
+            year=(1 << (aws_croniter.RANGES['year']['max'] -
+                        aws_croniter.RANGES['year']['min'] + 1)) - 1,
+            day_wk=aws_croniter.day_wk_masks(dict(
+                (wday + 1, nth)
+                for wday, nth in nth_weekday_of_month.items())),
+        )
+        if day_restricted and day_or:
+            return (
+                compiled._replace(day_of_week=0b1111111),
+                compiled._replace(day_of_month=(1 << 31) - 1),
+            )
+        return (compiled,)
+
+    @classmethod
+    def _normalize_nth_weekday_of_month(cls, nth_weekday_of_month):
+        """
+        Spreads a '*' weekday over every weekday and freezes the week sets.
+        """
+        nth_weekday_of_month = dict(nth_weekday_of_month)
+        if '*' in nth_weekday_of_month:
+            s = nth_weekday_of_month.pop('*')
+            for i in range(0, 7):
+                nth_weekday_of_month[i] = (
+                    nth_weekday_of_month.get(i, set()) | s)
+        return dict(
+            (wday, frozenset(nth))
+            for wday, nth in nth_weekday_of_month.items())
 
     @classmethod
     def _alphaconv(cls, index, key, expressions):
@@ -164,24 +261,30 @@ class croniter(object):
     iter = all_next  # alias, you can call .iter() instead of .all_next()
 
     def _get_next(self, ret_type=None, is_prev=False):
-        expanded = self.expanded[:]
-        nth_weekday_of_month = self.nth_weekday_of_month.copy()
-
         ret_type = ret_type or self._ret_type
-
         if not issubclass(ret_type, (float, datetime.datetime)):
             raise TypeError("Invalid ret_type, only 'float' or 'datetime' "
                             "is acceptable.")
+        if (
+            self._compiled is not None and
+            EPOCH_ENGINE_RANGE[0] <= self.cur < EPOCH_ENGINE_RANGE[1]
+        ):
+            result = self._calc_epoch(self.cur, is_prev)
+            if result is not None:
+                self.cur = result
+                if issubclass(ret_type, datetime.datetime):
+                    return self._timestamp_to_datetime(self.cur)
+                return self.cur
+
+        expanded = self.expanded
+        nth_weekday_of_month = self.nth_weekday_of_month
 
         # exception to support day of month and day of week as defined in cron
         if (expanded[2][0] != '*' and expanded[4][0] != '*') and self._day_or:
-            bak = expanded[4]
-            expanded[4] = ['*']
-            t1 = self._calc(self.cur, expanded, nth_weekday_of_month, is_prev)
-            expanded[4] = bak
-            expanded[2] = ['*']
-
-            t2 = self._calc(self.cur, expanded, nth_weekday_of_month, is_prev)
+            t1 = self._calc(self.cur, expanded[:4] + (('*',),) + expanded[5:],
+                            nth_weekday_of_month, is_prev)
+            t2 = self._calc(self.cur, expanded[:2] + (('*',),) + expanded[3:],
+                            nth_weekday_of_month, is_prev)
             if not is_prev:
                 result = t1 if t1 < t2 else t2
             else:
@@ -190,6 +293,13 @@ class croniter(object):
             result = self._calc(self.cur, expanded,
                                 nth_weekday_of_month, is_prev)
 
+        # Naive iteration has no DST to correct for.
+        if self.tzinfo is None:
+            self.cur = result
+            if issubclass(ret_type, datetime.datetime):
+                return self._timestamp_to_datetime(result)
+            return result
+
         # DST Handling for cron job spanning accross days
         dtstarttime = self._timestamp_to_datetime(self.start_time)
         dtstarttime_utcoffset = (
@@ -227,7 +337,29 @@ class croniter(object):
             result = dtresult
         return result
 
+    def _calc_epoch(self, now, is_prev):
+        """
+        Integer epoch engine: searches the compiled bitmasks directly on
+        epoch seconds, without building datetime objects. Returns None when
+        no time in its years matches, for the datetime engine to search
+        past them.
+        """
+        step = 60 if len(self.expanded) == 5 else 1
+        epoch = int(now // step) * step + (-step if is_prev else step)
+        results = []
+        for compiled in self._compiled:
+            try:
+                results.append(compiled.next_epoch(epoch, is_prev))
+            except aws_croniter.CroniterBadDateError:
+                pass
+        if not results:
+            return None
+        return float(max(results) if is_prev else min(results))
+
     def _calc(self, now, expanded, nth_weekday_of_month, is_prev):
+        if relativedelta is None:
+            raise ImportError(
+                "python-dateutil is required by the datetime engine.")
         if is_prev:
             nearest_diff_method = self._get_prev_nearest_diff
             sign = -1
@@ -240,22 +372,19 @@ class croniter(object):
 
         month, year = dst.month, dst.year
         current_year = now.year
-        DAYS = self.DAYS
+        calendar_table = aws_croniter.CALENDAR_TABLE
 
         def proc_month(d):
             if expanded[3][0] != '*':
                 diff_month = nearest_diff_method(
                     d.month, expanded[3], self.MONTHS_IN_YEAR)
-                days = DAYS[month - 1]
-                if month == 2 and self.is_leap(year) is True:
-                    days += 1
-
                 reset_day = 1
 
                 if diff_month is not None and diff_month != 0:
                     if is_prev:
                         d += relativedelta(months=diff_month)
-                        reset_day = DAYS[d.month - 1]
+                        reset_day = calendar_table.month(
+                            d.year, d.month).length
                         d += relativedelta(
                             day=reset_day, hour=23, minute=59, second=59)
                     else:
@@ -266,15 +395,13 @@ class croniter(object):
 
         def proc_day_of_month(d):
             if expanded[2][0] != '*':
-                days = DAYS[month - 1]
-                if month == 2 and self.is_leap(year) is True:
-                    days += 1
+                days = calendar_table.month(year, month).length
                 if 'l' in expanded[2] and days == d.day:
                     return False, d
 
                 if is_prev:
-                    days_in_prev_month = DAYS[
-                        (month - 2) % self.MONTHS_IN_YEAR]
+                    days_in_prev_month = calendar_table.month(
+                        year - (month == 1), (month - 2) % 12 + 1).length
                     diff_day = nearest_diff_method(
                         d.day, expanded[2], days_in_prev_month)
                 else:
@@ -305,25 +432,13 @@ class croniter(object):
             return False, d
 
         def proc_day_of_week_nth(d):
-            if '*' in nth_weekday_of_month:
-                s = nth_weekday_of_month['*']
-                for i in range(0, 7):
-                    if i in nth_weekday_of_month:
-                        nth_weekday_of_month[i].update(s)
-                    else:
-                        nth_weekday_of_month[i] = s
-                del nth_weekday_of_month['*']
-
             candidates = []
             for wday, nth in nth_weekday_of_month.items():
-                w = (wday + 6) % 7
-                c = calendar.Calendar(w).monthdayscalendar(d.year, d.month)
-                if c[0][0] == 0:
-                    c.pop(0)
                 for n in nth:
-                    if len(c) < n:
+                    candidate = calendar_table.nth_weekday(
+                        d.year, d.month, wday + 1, n)
+                    if candidate is None:
                         continue
-                    candidate = c[n - 1][0]
                     if (
                         (is_prev and candidate <= d.day) or
                         (not is_prev and d.day <= candidate)
@@ -335,9 +450,7 @@ class croniter(object):
                     d += relativedelta(days=-d.day,
                                        hour=23, minute=59, second=59)
                 else:
-                    days = DAYS[month - 1]
-                    if month == 2 and self.is_leap(year) is True:
-                        days += 1
+                    days = calendar_table.month(year, month).length
                     d += relativedelta(days=(days - d.day + 1),
                                        hour=0, minute=0, second=0)
                 return True, d
@@ -437,8 +550,7 @@ class croniter(object):
         return to_check[0] - x + range_val
 
     def _get_prev_nearest_diff(self, x, to_check, range_val):
-        candidates = to_check[:]
-        candidates.reverse()
+        candidates = to_check[::-1]
         for d in candidates:
             if d != 'l' and d <= x:
                 return d - x
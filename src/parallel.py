@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+import datetime
+import os
+
+from .aws_croniter import Croniter, CroniterBadDateError, validate_expression
+
+# Distinct expressions validated per task by validate_many.
+VALIDATE_CHUNKSIZE = 1024
+# Distinct expressions whose results validate_many remembers across batches.
+VALIDATED_LIMIT = 1 << 16
+
+
+def evaluate_chunk(compiled_expressions, epoch_1, epoch_2):
+    """
+        (executes_between, next execution time) of every compiled
+        expression, for the window epoch_1 to epoch_2.
+    """
+    results = []
+    for compiled in compiled_expressions:
+        try:
+            next_epoch = compiled.next_epoch(epoch_1)
+        except CroniterBadDateError:
+            results.append((False, None))
+        else:
+            results.append((next_epoch <= epoch_2, next_epoch))
+    return results
+
+
+def to_epoch(date):
+    if isinstance(date, datetime.datetime):
+        return Croniter.datetime_to_timestamp(date)
+    return date
+
+
+def shard(items, chunksize):
+    return [
+        items[index:index + chunksize]
+        for index in range(0, len(items), chunksize)
+    ]
+
+
+def evaluate_many(obj_expressions, date_1, date_2, max_workers=None,
+                  chunksize=None, executor=None):
+    """
+        Evaluates many expressions across a process pool. Returns, in
+        input order, (executes_between, next execution time at or after
+        date_1) for each, the time being None when there is none.
+
+        Expressions sharing a canonical key are evaluated once, and only
+        their compiled bitmasks are shipped to the workers, so nothing is
+        parsed again there. Pass an executor to reuse a pool across calls.
+    """
+    keys = [obj_expression.canonical_key for obj_expression in obj_expressions]
+    compiled_expressions = list(dict.fromkeys(keys))
+    epoch_1 = -int(-to_epoch(date_1) // 1)
+    epoch_2 = int(to_epoch(date_2) // 1)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, -(-len(compiled_expressions) // (max_workers * 4)))
+
+    if executor is None and max_workers == 1:
+        results = evaluate_chunk(compiled_expressions, epoch_1, epoch_2)
+    elif executor is None:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = map_chunks(
+                executor, compiled_expressions, epoch_1, epoch_2, chunksize
+            )
+    else:
+        results = map_chunks(
+            executor, compiled_expressions, epoch_1, epoch_2, chunksize
+        )
+    results = dict(zip(compiled_expressions, results))
+    return [results[key] for key in keys]
+
+
+def map_chunks(executor, compiled_expressions, epoch_1, epoch_2, chunksize):
+    chunks = shard(compiled_expressions, chunksize)
+    results = executor.map(
+        evaluate_chunk, chunks, repeat(epoch_1), repeat(epoch_2)
+    )
+    return [result for chunk in results for result in chunk]
+
+
+def validate_chunk(expressions):
+    return [validate_expression(expression) for expression in expressions]
+
+
+def validate_many(expressions, max_workers=None, chunksize=None,
+                  executor=None):
+    """
+        Validates many expression strings, see validate_expression. Yields
+        (index, ok, error) in input order, error being the CroniterError of
+        an invalid expression and None otherwise.
+
+        The input is consumed lazily, a batch of max_workers chunks at a
+        time. Identical strings are validated once within a batch, and
+        across batches for the first VALIDATED_LIMIT distinct ones, whose
+        results (None or the error) are remembered. No parsed expression
+        is kept. Items that are not strings are reported as invalid
+        without deduplication. Batches are validated in process by
+        default, across a process pool when max_workers is above 1, or on
+        the given executor. With an executor, pass its worker count as
+        max_workers so that every batch has a chunk per worker.
+    """
+    if max_workers is None:
+        max_workers = 1
+    if chunksize is None:
+        chunksize = VALIDATE_CHUNKSIZE
+    own_executor = executor is None and max_workers > 1
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    validated = {}
+    expressions = iter(expressions)
+    index = 0
+    try:
+        while True:
+            batch = list(islice(expressions, chunksize * max_workers))
+            if not batch:
+                break
+            pending = list(dict.fromkeys(
+                expression for expression in batch
+                if isinstance(expression, str) and
+                expression not in validated
+            ))
+            if executor is None:
+                results = validate_chunk(pending)
+            else:
+                results = [
+                    error for chunk in executor.map(
+                        validate_chunk, shard(pending, chunksize)
+                    ) for error in chunk
+                ]
+            errors = dict(zip(pending, results))
+            for expression in batch:
+                if not isinstance(expression, str):
+                    error = validate_expression(expression)
+                elif expression in errors:
+                    error = errors[expression]
+                else:
+                    error = validated[expression]
+                yield index, error is None, error
+                index += 1
+            for expression, error in errors.items():
+                if len(validated) >= VALIDATED_LIMIT:
+                    break
+                validated[expression] = error
+    finally:
+        if own_executor:
+            executor.shutdown()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from time import time
+import datetime
+import mmap
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from .aws_croniter import (
+    RANGES, RECORD, RECORD_FLAG_LAST_WORKDAY, RECORD_FLAG_RATE, RECORD_HEADER,
+    RECORD_MAGIC, RECORD_VERSION, Croniter, CroniterBadDateError,
+    civil_from_days, record_count, unpack_record, weekday_from_days
+)
+
+# numpy view of a RECORD, see CompiledExpression.to_bytes.
+if np is not None:
+    RECORD_DTYPE = np.dtype([
+        ('version', 'u1'), ('flags', 'u1'), ('second', '<u8'),
+        ('minute', '<u8'), ('hour', '<u4'), ('day_of_month', '<u4'),
+        ('month', '<u2'), ('day_of_week', 'u1'), ('day_wk', 'u1', (7,)),
+        ('year', 'u1', (32,)), ('day_of_month_last', '<u4'),
+        ('day_of_month_nearest', '<u4'), ('day_of_week_last', 'u1'),
+        ('reserved', 'V3'),
+    ])
+    assert RECORD_DTYPE.itemsize == RECORD.size
+
+# Byte offsets of the week number masks and the year mask in a RECORD.
+DAY_WK_OFFSET = 29
+YEAR_OFFSET = 36
+
+
+def split_timestamp(timestamp):
+    """
+        (second, minute, hour, day, month, weekday, year) bit positions of
+        a UNIX timestamp in the compiled bitmasks, None for years outside
+        of RANGES.
+    """
+    days, seconds = divmod(int(timestamp // 1), 86400)
+    year, month, day = civil_from_days(days)
+    hour, seconds = divmod(seconds, 3600)
+    minute, second = divmod(seconds, 60)
+    year = year - RANGES['year']['min']
+    if not 0 <= year <= RANGES['year']['max'] - RANGES['year']['min']:
+        return None
+    return (
+        second, minute, hour, day - 1, month - 1,
+        weekday_from_days(days) - 1, year
+    )
+
+
+class RuleStore(object):
+    """
+        Read-only table of compiled expressions in a memory-mapped file of
+        pack_many records, the rule id being the record index. Queries read
+        the mapped pages directly, so no Python object is kept per rule and
+        processes mapping the same file share its pages.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as rules_file:
+            self._buffer = mmap.mmap(
+                rules_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        self._count = record_count(self._buffer)
+
+    @classmethod
+    def create(cls, path, obj_expressions):
+        """
+            Writes the compiled forms of obj_expressions to path, one record
+            after the other, and opens the store.
+        """
+        count = 0
+        with open(path, 'wb') as rules_file:
+            rules_file.write(b'\0' * RECORD_HEADER.size)
+            for obj_expression in obj_expressions:
+                rules_file.write(obj_expression.compiled.to_bytes())
+                count += 1
+            rules_file.seek(0)
+            rules_file.write(RECORD_HEADER.pack(
+                RECORD_MAGIC, RECORD_VERSION, RECORD.size, count
+            ))
+        return cls(path)
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._buffer.close()
+
+    def compiled(self, rule_id):
+        """
+            Decodes the compiled expression of rule_id.
+        """
+        if not 0 <= rule_id < self._count:
+            raise IndexError('No rule {}.'.format(rule_id))
+        return unpack_record(self._buffer, rule_id)
+
+    def next_fire_time(self, rule_id, start_time=None):
+        """
+            First execution time of rule_id after start_time (default now),
+            None if there is none.
+        """
+        if start_time is None:
+            start_time = time()
+        elif isinstance(start_time, datetime.datetime):
+            start_time = Croniter.datetime_to_timestamp(start_time)
+        try:
+            return self.compiled(rule_id).next_epoch(int(start_time // 1) + 1)
+        except CroniterBadDateError:
+            return None
+
+    def fires_at(self, timestamp):
+        """
+            Rule ids of the expressions running at timestamp (a datetime or
+            UNIX timestamp), in rule id order.
+        """
+        if isinstance(timestamp, datetime.datetime):
+            timestamp = Croniter.datetime_to_timestamp(timestamp)
+        bits = split_timestamp(timestamp)
+        if bits is None or not self._count:
+            return []
+        if np is None:
+            return self._scan(int(timestamp // 1), bits)
+        return self._match(int(timestamp // 1), bits)
+
+    def _match(self, epoch, bits):
+        second, minute, hour, day, month, weekday, year = bits
+        records = np.frombuffer(
+            self._buffer, RECORD_DTYPE, self._count, RECORD_HEADER.size
+        )
+        # Rate records hold their period and anchor in second and minute.
+        is_rate = records['flags'] & RECORD_FLAG_RATE != 0
+        rates = np.zeros(self._count, dtype=bool)
+        if is_rate.any():
+            period = records['second'][is_rate].astype(np.int64)
+            anchor = records['minute'][is_rate].astype(np.int64)
+            rates[is_rate] = (anchor <= epoch) & (
+                (epoch - anchor) % period == 0
+            )
+        matches = ~is_rate
+        matches &= records['year'][:, year // 8] >> (year % 8) & 1 != 0
+        for field_name, bit in (
+            ('month', month), ('hour', hour), ('minute', minute),
+            ('second', second),
+        ):
+            matches &= records[field_name] >> bit & 1 != 0
+        # Records with 'L' or 'W' days resolve their days per month, from
+        # their decoded compiled form.
+        day_operators = (
+            (records['day_of_month_last'] != 0) |
+            (records['day_of_month_nearest'] != 0) |
+            (records['day_of_week_last'] != 0) |
+            (records['flags'] & RECORD_FLAG_LAST_WORKDAY != 0)
+        )
+        resolved = np.flatnonzero(matches & day_operators)
+        matches &= ~day_operators
+        matches &= records['day_of_month'] >> day & 1 != 0
+        matches &= records['day_of_week'] >> weekday & 1 != 0
+        matches &= records['day_wk'][:, weekday] >> (day // 7) & 1 != 0
+        for rule_id in resolved.tolist():
+            matches[rule_id] = self._day_matches(rule_id, bits)
+        return np.flatnonzero(matches | rates).tolist()
+
+    def _day_matches(self, rule_id, bits):
+        day, month, year = bits[3], bits[4], bits[6]
+        return bool(unpack_record(self._buffer, rule_id).day_mask(
+            year + RANGES['year']['min'], month + 1
+        ) >> day & 1)
+
+    def _scan(self, epoch, bits):
+        second, minute, hour, day, month, weekday, year = bits
+        year_byte, year_bit = YEAR_OFFSET + year // 8, year % 8
+        weekday_byte, week = DAY_WK_OFFSET + weekday, day // 7
+        buffer = self._buffer
+        matches = []
+        for rule_id in range(self._count):
+            offset = RECORD_HEADER.size + rule_id * RECORD.size
+            if buffer[offset + 1] & RECORD_FLAG_RATE:
+                _, _, period, anchor = RECORD.unpack_from(buffer, offset)[:4]
+                if anchor <= epoch and (epoch - anchor) % period == 0:
+                    matches.append(rule_id)
+                continue
+            if not buffer[offset + year_byte] >> year_bit & 1:
+                continue
+            record = RECORD.unpack_from(buffer, offset)
+            (_, flags, second_mask, minute_mask, hour_mask, day_mask,
+             month_mask, day_of_week_mask) = record[:8]
+            if not (
+                month_mask >> month & hour_mask >> hour &
+                minute_mask >> minute & second_mask >> second & 1
+            ):
+                continue
+            if any(record[10:]) or flags & RECORD_FLAG_LAST_WORKDAY:
+                if self._day_matches(rule_id, bits):
+                    matches.append(rule_id)
+            elif (
+                day_mask >> day & day_of_week_mask >> weekday &
+                buffer[offset + weekday_byte] >> week & 1
+            ):
+                matches.append(rule_id)
+        return matches
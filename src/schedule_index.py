@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+import datetime
+
+from .aws_croniter import (
+    ALL_WEEKS, RANGES, CompiledRate, Croniter, civil_from_days,
+    weekday_from_days
+)
+
+# Fields indexed by value, day_of_week is indexed by (weekday, week number).
+VALUE_FIELDS = ('second', 'minute', 'hour', 'day_of_month', 'month', 'year')
+WEEKS = 5
+
+
+def field_size(field_name):
+    return RANGES[field_name]['max'] - RANGES[field_name]['min'] + 1
+
+
+class ScheduleIndex(object):
+    """
+        Inverted index of many expressions: for every field value it keeps
+        the posting set of the schedules running at that value, plus the
+        set of the schedules using * in that field. The schedules running
+        at a given time are in one of the two sets of every field: they
+        are found from the field with the fewest candidates, narrowed down
+        field by field, so a query costs about the size of its smallest
+        posting rather than the number of rules.
+
+        Rules are grouped by the canonical key of their expression, so all
+        the rules sharing a schedule take a single slot in the postings and
+        matching it fans out to their rule ids. Rate expressions are kept
+        out of the postings, in buckets by period and phase. Schedules with
+        'L' or 'W' days are indexed as running every day, their matches are
+        then checked against their day bitmask of the month.
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._key_slots = {}
+        self._rule_ids = []
+        self._compiled = []
+        self._free_slots = []
+        # {period: {anchor % period: [slot]}} of the rate expressions.
+        self._rates = {}
+        # Slots of the schedules with 'L' or 'W' days.
+        self._day_operators = set()
+        self._wildcards = {}
+        self._values = {}
+        for field_name in VALUE_FIELDS + ('day_of_week',):
+            self._wildcards[field_name] = set()
+        for field_name in VALUE_FIELDS:
+            self._values[field_name] = [
+                set() for _ in range(field_size(field_name))
+            ]
+        self._values['day_of_week'] = [set() for _ in range(7 * WEEKS)]
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, rule_id):
+        return rule_id in self._slots
+
+    def schedule_count(self):
+        """
+            Number of distinct schedules among the indexed rules.
+        """
+        return len(self._key_slots)
+
+    def add(self, rule_id, obj_expression):
+        """
+            Indexes obj_expression under rule_id, replacing any expression
+            previously indexed under it.
+        """
+        if rule_id in self._slots:
+            self.remove(rule_id)
+        key = obj_expression.canonical_key
+        slot = self._key_slots.get(key)
+        if slot is None:
+            slot = self._add_slot(key)
+        self._slots[rule_id] = slot
+        self._rule_ids[slot][rule_id] = None
+
+    def remove(self, rule_id):
+        slot = self._slots.pop(rule_id)
+        rule_ids = self._rule_ids[slot]
+        del rule_ids[rule_id]
+        if rule_ids:
+            return
+        compiled = self._compiled[slot]
+        if isinstance(compiled, CompiledRate):
+            phases = self._rates[compiled.period]
+            phase = compiled.anchor % compiled.period
+            phases[phase].remove(slot)
+            if not phases[phase]:
+                del phases[phase]
+            if not phases:
+                del self._rates[compiled.period]
+        for posting in self._postings(compiled):
+            posting.discard(slot)
+        self._day_operators.discard(slot)
+        del self._key_slots[compiled]
+        self._rule_ids[slot] = None
+        self._compiled[slot] = None
+        self._free_slots.append(slot)
+
+    def _add_slot(self, compiled):
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self._rule_ids)
+            self._rule_ids.append(None)
+            self._compiled.append(None)
+        self._key_slots[compiled] = slot
+        # Rule ids of the slot, in insertion order.
+        self._rule_ids[slot] = {}
+        self._compiled[slot] = compiled
+        if isinstance(compiled, CompiledRate):
+            self._rates.setdefault(compiled.period, {}).setdefault(
+                compiled.anchor % compiled.period, []
+            ).append(slot)
+        elif compiled.day_operators:
+            self._day_operators.add(slot)
+        for posting in self._postings(compiled):
+            posting.add(slot)
+        return slot
+
+    def fires_at(self, timestamp):
+        """
+            Rule ids of the expressions running at timestamp (a datetime or
+            UNIX timestamp), grouped by schedule in slot order.
+        """
+        if isinstance(timestamp, datetime.datetime):
+            timestamp = Croniter.datetime_to_timestamp(timestamp)
+        epoch = int(timestamp // 1)
+        days, seconds = divmod(epoch, 86400)
+        year, month, day = civil_from_days(days)
+        hour, seconds = divmod(seconds, 3600)
+        minute, second = divmod(seconds, 60)
+        weekday = weekday_from_days(days)
+        year = year - RANGES['year']['min']
+        if not 0 <= year < field_size('year'):
+            return []
+
+        fields = sorted((
+            (self._values[field_name][value], self._wildcards[field_name])
+            for field_name, value in (
+                ('year', year), ('month', month - 1),
+                ('day_of_month', day - 1), ('hour', hour),
+                ('minute', minute), ('second', second),
+                ('day_of_week', (weekday - 1) * WEEKS + (day - 1) // 7),
+            )
+        ), key=lambda postings: len(postings[0]) + len(postings[1]))
+        # The two postings of a field are disjoint, set intersections only
+        # iterate the smaller side.
+        values, wildcards = fields[0]
+        matches = values | wildcards
+        for values, wildcards in fields[1:]:
+            if not matches:
+                break
+            matches = (matches & values) | (matches & wildcards)
+        # Only the matching schedules with 'L' or 'W' days are resolved.
+        for slot in matches & self._day_operators:
+            if not self._compiled[slot].day_mask(
+                year + RANGES['year']['min'], month
+            ) >> (day - 1) & 1:
+                matches.discard(slot)
+        rule_ids = [
+            rule_id
+            for slot in sorted(matches)
+            for rule_id in self._rule_ids[slot]
+        ]
+        for period, phases in self._rates.items():
+            for slot in phases.get(epoch % period, ()):
+                if self._compiled[slot].anchor <= epoch:
+                    rule_ids.extend(self._rule_ids[slot])
+        return rule_ids
+
+    def _postings(self, compiled):
+        """
+            The posting sets a compiled expression is in.
+        """
+        if isinstance(compiled, CompiledRate):
+            return
+        day_operators = compiled.day_operators
+        for field_name in VALUE_FIELDS:
+            mask = getattr(compiled, field_name)
+            if mask == (1 << field_size(field_name)) - 1 or (
+                day_operators and field_name == 'day_of_month'
+            ):
+                yield self._wildcards[field_name]
+                continue
+            values = self._values[field_name]
+            while mask:
+                low = mask & -mask
+                yield values[low.bit_length() - 1]
+                mask ^= low
+
+        if day_operators or compiled.day_of_week == 0b1111111 and (
+            compiled.day_wk == (ALL_WEEKS,) * 7
+        ):
+            yield self._wildcards['day_of_week']
+            return
+        for weekday in range(7):
+            if not compiled.day_of_week >> weekday & 1:
+                continue
+            for wk_number in range(WEEKS):
+                if compiled.day_wk[weekday] >> wk_number & 1:
+                    yield self._values['day_of_week'][
+                        weekday * WEEKS + wk_number
+                    ]
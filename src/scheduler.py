@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from collections import namedtuple
+from itertools import count
+from time import time
+import datetime
+import heapq
+
+from .aws_croniter import Croniter, CroniterBadDateError
+
+SchedulerStats = namedtuple('SchedulerStats', [
+    'rules', 'heap_size', 'fired', 'last_lag', 'max_lag'
+])
+
+
+class Scheduler(object):
+    """
+        Merges the execution times of many expressions in one heap keyed
+        by next execution time. Popping due rules only advances those
+        rules, each firing costs O(log n).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._counter = count()
+        self.fired = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, rule_id):
+        return rule_id in self._entries
+
+    def add(self, rule_id, obj_expression, start_time=None):
+        """
+            Schedules obj_expression under rule_id from its first execution
+            time after start_time (default now), replacing any expression
+            scheduled under rule_id.
+        """
+        if rule_id in self._entries:
+            self.remove(rule_id)
+        if start_time is None:
+            start_time = time()
+        elif isinstance(start_time, datetime.datetime):
+            start_time = Croniter.datetime_to_timestamp(start_time)
+        try:
+            next_epoch = obj_expression.compiled.next_epoch(
+                int(start_time // 1) + 1
+            )
+        except CroniterBadDateError:
+            return
+        entry = [next_epoch, next(self._counter), rule_id,
+                 obj_expression.compiled]
+        self._entries[rule_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, rule_id):
+        # Entries are dropped lazily when they reach the top of the heap.
+        self._entries.pop(rule_id)[-1] = None
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [entry for entry in self._heap if entry[-1]]
+            heapq.heapify(self._heap)
+
+    def next_fire_time(self):
+        """
+            The earliest pending execution time, None if nothing is left.
+        """
+        self._drop_removed()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """
+            Returns (rule_id, execution time) for every execution due at or
+            before now, in time order, and advances those rules.
+        """
+        if now is None:
+            now = time()
+        elif isinstance(now, datetime.datetime):
+            now = Croniter.datetime_to_timestamp(now)
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= now:
+            entry = heap[0]
+            epoch, _, rule_id, compiled = entry
+            if compiled is None:
+                heapq.heappop(heap)
+                continue
+            due.append((rule_id, epoch))
+            lag = now - epoch
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            try:
+                entry[0] = compiled.next_epoch(epoch + 1)
+            except CroniterBadDateError:
+                heapq.heappop(heap)
+                del self._entries[rule_id]
+                continue
+            entry[1] = next(self._counter)
+            heapq.heapreplace(heap, entry)
+        self.fired += len(due)
+        return due
+
+    def stats(self):
+        return SchedulerStats(
+            len(self._entries), len(self._heap), self.fired, self.last_lag,
+            self.max_lag
+        )
+
+    def _drop_removed(self):
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
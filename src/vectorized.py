@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from itertools import islice, takewhile
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from .aws_croniter import CompiledRate, EPOCH_MAX, PERIOD_MAX, RANGES
+
+YEAR_MIN = RANGES['year']['min']
+YEARS = RANGES['year']['max'] - YEAR_MIN + 1
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError('numpy is required for vectorized matching.')
+
+
+def mask_table(mask, size):
+    """
+        Boolean lookup table of a field bitmask: table[i] is bit i.
+    """
+    bits = np.frombuffer(mask.to_bytes((size + 7) // 8, 'little'), np.uint8)
+    return np.unpackbits(bits, bitorder='little')[:size].astype(bool)
+
+
+def to_epoch_seconds(timestamps):
+    """
+        Converts a datetime64 array, or an array of UNIX timestamps, to an
+        int64 array of epoch seconds.
+    """
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        return timestamps.astype('datetime64[s]').astype(np.int64)
+    if np.issubdtype(timestamps.dtype, np.floating):
+        return np.floor(timestamps).astype(np.int64)
+    return timestamps.astype(np.int64, copy=False)
+
+
+def split_epochs(epochs):
+    """
+        Vectorized civil_from_days: splits epoch seconds into year, month,
+        day and seconds of the day arrays.
+    """
+    days, seconds = np.divmod(epochs, 86400)
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (
+        day_of_era - day_of_era // 1460 + day_of_era // 36524 -
+        day_of_era // 146096
+    ) // 365
+    day_of_year = day_of_era - (
+        365 * year_of_era + year_of_era // 4 - year_of_era // 100
+    )
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = np.where(shifted_month < 10, shifted_month + 3, shifted_month - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day, seconds
+
+
+def match_timestamps(obj_expression, timestamps):
+    """
+        Boolean mask of the timestamps (datetime64 or epoch seconds) the
+        expression runs at.
+    """
+    require_numpy()
+    compiled = obj_expression.compiled
+    epochs = to_epoch_seconds(timestamps)
+    if isinstance(compiled, CompiledRate):
+        return (
+            (epochs >= compiled.anchor) & (epochs <= EPOCH_MAX) &
+            ((epochs - compiled.anchor) % compiled.period == 0)
+        )
+    year, month, day, seconds = split_epochs(epochs.ravel())
+    hour, seconds = np.divmod(seconds, 3600)
+    minute, second = np.divmod(seconds, 60)
+
+    result = mask_table(compiled.second, 60)[second]
+    result &= mask_table(compiled.minute, 60)[minute]
+    result &= mask_table(compiled.hour, 24)[hour]
+
+    year_index = year - YEAR_MIN
+    in_range = (year_index >= 0) & (year_index < YEARS)
+    year_index = np.where(in_range, year_index, 0)
+    result &= in_range & mask_table(compiled.year, YEARS)[year_index]
+    result &= mask_table(compiled.month, 12)[month - 1]
+
+    # Day matching depends on the month (weekdays, '#'), so build one
+    # day table per distinct year and month in the batch.
+    month_index = year_index * 12 + (month - 1)
+    months, inverse = np.unique(month_index[result], return_inverse=True)
+    if len(months):
+        day_tables = np.stack([
+            mask_table(
+                compiled.day_mask(YEAR_MIN + index // 12, index % 12 + 1), 31
+            )
+            for index in months.tolist()
+        ])
+        result[result] = day_tables[inverse.ravel(), day[result] - 1]
+    return result.reshape(epochs.shape)
+
+
+def mask_values(mask):
+    """
+        Indices of the set bits of a bitmask, as an int64 array.
+    """
+    return np.flatnonzero(mask_table(mask, mask.bit_length()))
+
+
+def time_offsets(compiled):
+    """
+        Sorted seconds of the day the expression runs at.
+    """
+    return np.add.outer(
+        np.add.outer(
+            mask_values(compiled.hour) * 3600,
+            mask_values(compiled.minute) * 60
+        ),
+        mask_values(compiled.second)
+    ).ravel()
+
+
+def occurrences_array(compiled, start, end=None, count=None):
+    """
+        Execution times at or after start, up to end or count of them, in
+        a preallocated int64 array filled one matching day per row.
+    """
+    require_numpy()
+    if isinstance(compiled, CompiledRate):
+        return rate_occurrences(compiled, start, end, count)
+    offsets = time_offsets(compiled)
+    start_day, start_second = divmod(start, 86400)
+    days = compiled.iter_days(start_day)
+    if end is not None:
+        end_day, end_second = divmod(end, 86400)
+        days = takewhile(lambda day: day <= end_day, days)
+    else:
+        # Enough days for count executions, after skipping the part of
+        # the first day before start.
+        days_needed = (count + len(offsets) - 1) // len(offsets) + 1
+        days = islice(days, days_needed)
+    days = np.fromiter(days, dtype=np.int64)
+
+    result = np.empty(len(days) * len(offsets), dtype=np.int64)
+    table = result.reshape(len(days), len(offsets))
+    np.multiply(days[:, None], 86400, out=table)
+    table += offsets
+
+    low, high = 0, len(result)
+    if len(days) and days[0] == start_day:
+        low = np.searchsorted(offsets, start_second)
+    if end is not None:
+        if len(days) and days[-1] == end_day:
+            high -= len(offsets) - np.searchsorted(
+                offsets, end_second, side='right'
+            )
+    else:
+        high = min(high, low + count)
+    return result[low:high]
+
+
+def rate_occurrences(compiled, start, end=None, count=None):
+    """
+        occurrences_array of a CompiledRate, an arithmetic progression.
+    """
+    first = compiled.iter_epochs(start, EPOCH_MAX)
+    first = next(first, None)
+    if first is None:
+        return np.empty(0, dtype=np.int64)
+    if end is None:
+        end = first + (count - 1) * compiled.period
+    end = min(end, EPOCH_MAX)
+    return np.arange(first, end + 1, compiled.period, dtype=np.int64)
+
+
+def zoned_occurrences(zoned, start, end=None, count=None):
+    """
+        occurrences_array of a ZonedExpression: the occurrences in every
+        local time range of its zone, shifted to UTC.
+    """
+    require_numpy()
+    arrays = []
+    found = 0
+    ranges = zoned.zone.local_ranges(start, PERIOD_MAX if end is None else end)
+    for first, last, offset in ranges:
+        if count is None:
+            array = occurrences_array(zoned.compiled, first, last)
+        else:
+            array = occurrences_array(
+                zoned.compiled, first, count=count - found
+            )
+            array = array[array <= last]
+        arrays.append(array - offset)
+        found += len(array)
+        if count is not None and found >= count:
+            break
+    if not arrays:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(arrays)
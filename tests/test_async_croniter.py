@@ -0,0 +1,72 @@
+import asyncio
+import math
+
+from datetime import datetime
+
+from src.aws_croniter import CronExpression
+from src.async_croniter import AsyncCronRunner
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+def fast_clock(loop, lead=0.05):
+    """
+        Wall clock tied to the loop clock, a whole second lead seconds away.
+    """
+    offset = math.ceil(loop.time()) + 1000 - lead - loop.time()
+    return lambda: loop.time() + offset
+
+
+class TestAsyncCronRunner(object):
+    def test_single_timer_for_many_schedules(self):
+        async def main():
+            loop = asyncio.get_running_loop()
+            runner = AsyncCronRunner(clock=fast_clock(loop))
+            schedules = [
+                runner.schedule(CronExpression("* * * ? * * *"))
+                for _ in range(100)
+            ]
+            timers = [runner._timer]
+            fired = await asyncio.gather(*[
+                schedule.__anext__() for schedule in schedules
+            ])
+            runner.close()
+            return timers, fired, runner.stats()
+
+        timers, fired, stats = run(main())
+        assert timers[0] is not None
+        assert len(set(fired)) == 1
+        assert stats.fired == 100
+        assert stats.rules == 0
+
+    def test_async_for_ends_with_schedule(self):
+        async def main():
+            loop = asyncio.get_running_loop()
+            clock = fast_clock(loop)
+            runner = AsyncCronRunner(clock=clock)
+            year = datetime.utcfromtimestamp(clock()).year
+            expression = CronExpression(
+                "* * * ? * * {}".format(year)
+            )
+            result = []
+            async for fire_time in runner.schedule(
+                expression, start_time=clock(), ret_type=datetime
+            ):
+                result.append(fire_time)
+                if len(result) == 2:
+                    runner.close()
+            return result
+
+        result = run(main())
+        assert len(result) == 2
+        assert (result[1] - result[0]).total_seconds() == 1
+
+    def test_exhausted_schedule(self):
+        async def main():
+            runner = AsyncCronRunner()
+            schedule = runner.schedule(CronExpression("0 0 0 1 1 ? 2018"))
+            return [fire_time async for fire_time in schedule]
+
+        assert run(main()) == []
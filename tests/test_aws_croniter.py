@@ -1,8 +1,15 @@
+import pickle
+
 import pytest
 
-from datetime import datetime
+from datetime import datetime, timezone
 
-from src.aws_croniter import CronExpression, Croniter
+from src.aws_croniter import (
+    CronExpression, Croniter, CroniterBadCronError, CroniterBadDateError,
+    CroniterSyntaxError, CalendarTable, CompiledExpression, CroniterError,
+    ExpressionCache, pack_many, record_count, unpack_many, unpack_record,
+    RECORD, RateExpression, parse_expression
+)
 
 
 class TestExecutesBetween(object):
@@ -55,6 +62,30 @@ class TestExecutesBetween(object):
             datetime(2018, 1, 22, 0, 0, 0),
             False
         ),
+        (
+            "0 55 0 1 * ? *",
+            datetime(2018, 1, 31, 23, 50, 0),
+            datetime(2018, 2, 1, 0, 10, 0),
+            False
+        ),
+        (
+            "0 5 0 1 * ? *",
+            datetime(2018, 1, 31, 23, 50, 0),
+            datetime(2018, 2, 1, 0, 10, 0),
+            True
+        ),
+        (
+            "0 0 12 29 2 ? *",
+            datetime(2001, 1, 1, 0, 0, 0),
+            datetime(2003, 12, 31, 0, 0, 0),
+            False
+        ),
+        (
+            "0 0 12 29 2 ? *",
+            datetime(1990, 1, 1, 0, 0, 0),
+            datetime(2190, 1, 1, 0, 0, 0),
+            True
+        ),
     ])
     def test_executes_between(self, expression, date_1, date_2, expected):
         obj_expression = CronExpression(expression)
@@ -166,6 +197,9 @@ class TestExpandField(object):
         (
             "* * * * * ? *", 'day_of_week', 'sUn-thU/2', ([1, 3, 5], {})
         ),
+        (
+            "* * * * * ? *", 'minute', '0/15', ([0, 15, 30, 45], {})
+        ),
     ])
     def test_expand_field(self, expression, field_name, field, expected):
         obj_expression = CronExpression(expression)
@@ -173,6 +207,56 @@ class TestExpandField(object):
         assert result == expected
 
 
+class TestSyntaxError(object):
+    @pytest.mark.parametrize("expression, field_name, position", [
+        ("0 61 * ? * * *", 'minute', 2),
+        ("61 * ? * * *", 'minute', 0),
+        ("0 0 10-5 ? * * *", 'hour', 4),
+        ("0 0 * ? * MON-FRI,FOO *", 'day_of_week', 18),
+        ("0 0 * ? * 2#6 *", 'day_of_week', 10),
+        ("0 */0 * ? * * *", 'minute', 2),
+        ("0 0 * 1,,2 * ? *", 'day_of_month', 8),
+        ("0 0 * 32W * ? *", 'day_of_month', 6),
+        ("0 0 ? ? * * *", 'hour', 4),
+        ("0 0 * ? * * 1969", 'year', 12),
+        ("0 0 * 1 * MON *", 'day_of_week', 10),
+    ])
+    def test_location(self, expression, field_name, position):
+        with pytest.raises(CroniterSyntaxError) as error:
+            CronExpression(expression)
+        assert error.value.field_name == field_name
+        assert error.value.position == position
+        assert error.value.expression == expression.lower()
+
+    @pytest.mark.parametrize("expression, position, count", [
+        ("0 0 * ? * * * *", 14, 8),
+        ("0 0 * ? *", 9, 5),
+    ])
+    def test_field_count(self, expression, position, count):
+        with pytest.raises(CroniterSyntaxError) as error:
+            CronExpression(expression)
+        assert error.value.field_name is None
+        assert error.value.position == position
+        assert error.value.expression == expression
+        assert str(error.value) == (
+            'Cron expression should be 6 or 7 fields, not {}. '
+            '(at position {} of {!r})'.format(count, position, expression)
+        )
+
+    def test_silent(self, capsys):
+        with pytest.raises(CroniterBadCronError):
+            CronExpression("0 0 * ? * MON,FOO *")
+        assert capsys.readouterr().out == ''
+
+    def test_pickle(self):
+        with pytest.raises(CroniterSyntaxError) as error:
+            CronExpression("0 61 * ? * * *")
+        result = pickle.loads(pickle.dumps(error.value))
+        assert (result.field_name, result.position, str(result)) == (
+            'minute', 2, str(error.value)
+        )
+
+
 class TestCalendarToNum(object):
     @pytest.mark.parametrize("expression, value, field_name, expected", [
         (
@@ -210,3 +294,588 @@ class TestCalendarToNum(object):
         obj_expression = CronExpression(expression)
         result = obj_expression.calendar_to_num(field_name, value)
         assert result == expected
+
+
+class TestCompile(object):
+    @pytest.mark.parametrize("expression, expected", [
+        (
+            "0 59 5/5 10-16 2-10/2 ? 2018",
+            (
+                0b1,
+                1 << 59,
+                0b100001000010000100000,
+                0b1111111000000000,
+                0b1010101010,
+                0b1111111,
+                1 << 48,
+                (0b11111,) * 7,
+                0, 0, 0, 0
+            )
+        ),
+        (
+            "0 0 * ? * Mon#1,ThU#2-3 *",
+            (
+                0b1,
+                0b1,
+                (1 << 24) - 1,
+                (1 << 31) - 1,
+                (1 << 12) - 1,
+                0b10010,
+                (1 << 230) - 1,
+                (0b11111, 0b1, 0b11111, 0b11111, 0b110, 0b11111, 0b11111),
+                0, 0, 0, 0
+            )
+        ),
+        (
+            "0 0 0 L-2,15W,LW,L * ? *",
+            (
+                0b1, 0b1, 0b1, 0, (1 << 12) - 1, 0b1111111, (1 << 230) - 1,
+                (0b11111,) * 7, 0b101, 1 << 14, 1, 0
+            )
+        ),
+        (
+            "0 0 0 ? * 2,6L,SATL *",
+            (
+                0b1, 0b1, 0b1, (1 << 31) - 1, (1 << 12) - 1, 0b10,
+                (1 << 230) - 1, (0b11111,) * 7, 0, 0, 0, 0b1100000
+            )
+        ),
+    ])
+    def test_compile(self, expression, expected):
+        obj_expression = CronExpression(expression)
+        assert obj_expression.compiled == expected
+
+    def test_out_of_range(self):
+        with pytest.raises(CroniterBadCronError):
+            CronExpression("0 0 25 ? * * *")
+
+
+class TestGetNext(object):
+    @pytest.mark.parametrize("expression, start_time, expected", [
+        (
+            "0 0 12 ? * Sat#3 2018",
+            datetime(2018, 1, 1, 0, 0, 0),
+            [
+                datetime(2018, 1, 20, 12, 0, 0),
+                datetime(2018, 2, 17, 12, 0, 0),
+                datetime(2018, 3, 17, 12, 0, 0),
+            ]
+        ),
+        (
+            "*/20 * * ? * * *",
+            datetime(2017, 12, 31, 23, 59, 30),
+            [
+                datetime(2017, 12, 31, 23, 59, 40),
+                datetime(2018, 1, 1, 0, 0, 0),
+                datetime(2018, 1, 1, 0, 0, 20),
+            ]
+        ),
+        (
+            "0 0 31 * ? *",
+            datetime(2018, 1, 1, 0, 0, 0),
+            [
+                datetime(2018, 1, 31, 0, 0, 0),
+                datetime(2018, 3, 31, 0, 0, 0),
+                datetime(2018, 5, 31, 0, 0, 0),
+            ]
+        ),
+        (
+            "0 0 29 2 ? *",
+            datetime(2018, 1, 1, 0, 0, 0),
+            [
+                datetime(2020, 2, 29, 0, 0, 0),
+                datetime(2024, 2, 29, 0, 0, 0),
+                datetime(2028, 2, 29, 0, 0, 0),
+            ]
+        ),
+        (
+            "0 0 0 L-3 * ? *",
+            datetime(2020, 1, 28, 12, 0, 0),
+            [
+                datetime(2020, 2, 26, 0, 0, 0),
+                datetime(2020, 3, 28, 0, 0, 0),
+            ]
+        ),
+        (
+            "0 0 0 15W,1W * ? *",
+            datetime(2018, 9, 1, 0, 0, 0),
+            [
+                datetime(2018, 9, 3, 0, 0, 0),
+                datetime(2018, 9, 14, 0, 0, 0),
+                datetime(2018, 10, 1, 0, 0, 0),
+                datetime(2018, 10, 15, 0, 0, 0),
+            ]
+        ),
+        (
+            "0 0 0 LW * ? *",
+            datetime(2018, 6, 1, 0, 0, 0),
+            [
+                datetime(2018, 6, 29, 0, 0, 0),
+                datetime(2018, 7, 31, 0, 0, 0),
+                datetime(2018, 8, 31, 0, 0, 0),
+            ]
+        ),
+        (
+            "0 0 0 ? * 6L *",
+            datetime(2018, 1, 1, 0, 0, 0),
+            [
+                datetime(2018, 1, 26, 0, 0, 0),
+                datetime(2018, 2, 23, 0, 0, 0),
+                datetime(2018, 3, 30, 0, 0, 0),
+            ]
+        ),
+    ])
+    def test_get_next(self, expression, start_time, expected):
+        awscron_iter = Croniter(CronExpression(expression), start_time)
+        result = [awscron_iter.get_next(datetime) for _ in expected]
+        assert result == expected
+
+    @pytest.mark.parametrize("expression, start_time, expected", [
+        (
+            "0 0 12 ? * Sat#3 2018",
+            datetime(2018, 3, 17, 12, 0, 0),
+            [
+                datetime(2018, 2, 17, 12, 0, 0),
+                datetime(2018, 1, 20, 12, 0, 0),
+            ]
+        ),
+        (
+            "0 30 9 ? * MON-FRI *",
+            datetime(2018, 1, 8, 9, 0, 0),
+            [
+                datetime(2018, 1, 5, 9, 30, 0),
+                datetime(2018, 1, 4, 9, 30, 0),
+            ]
+        ),
+        (
+            "0 0 0 L * ? *",
+            datetime(2020, 3, 31, 0, 0, 0),
+            [
+                datetime(2020, 2, 29, 0, 0, 0),
+                datetime(2020, 1, 31, 0, 0, 0),
+            ]
+        ),
+    ])
+    def test_get_prev(self, expression, start_time, expected):
+        awscron_iter = Croniter(CronExpression(expression), start_time)
+        result = [awscron_iter.get_prev(datetime) for _ in expected]
+        assert result == expected
+
+    def test_float_ret_type(self):
+        awscron_iter = Croniter(CronExpression("0 * * ? * * *"), 30.5)
+        assert awscron_iter.get_next() == 60.0
+        assert awscron_iter.get_prev() == 0.0
+
+    def test_no_next_date(self):
+        awscron_iter = Croniter(
+            CronExpression("0 0 0 ? * * 2018"), datetime(2019, 1, 1)
+        )
+        with pytest.raises(CroniterBadDateError):
+            awscron_iter.get_next()
+
+
+class TestExpressionCache(object):
+    def test_hits_and_misses(self):
+        cache = ExpressionCache(maxsize=2)
+        obj_expression = cache.get("0 0 * ? * MON *")
+        assert cache.get("0  0 * ? * mon *") is obj_expression
+        assert cache.info() == (1, 1, 2, 1)
+
+    def test_eviction(self):
+        cache = ExpressionCache(maxsize=2)
+        cache.get("0 0 * ? * MON *")
+        cache.get("0 0 * ? * TUE *")
+        cache.get("0 0 * ? * MON *")
+        cache.get("0 0 * ? * WED *")
+        assert "0 0 * ? * MON *" in cache
+        assert "0 0 * ? * TUE *" not in cache
+        cache.maxsize = 1
+        assert len(cache) == 1
+
+    def test_clear(self):
+        cache = ExpressionCache()
+        cache.get("0 0 * ? * MON *")
+        cache.clear()
+        assert cache.info() == (0, 0, 4096, 0)
+
+    def test_immutable(self):
+        obj_expression = CronExpression("0 0 * ? * MON *")
+        with pytest.raises(AttributeError):
+            obj_expression.fields = None
+        with pytest.raises(TypeError):
+            obj_expression.day_wk_numbers[1] = {1}
+
+
+class TestCalendarTable(object):
+    @pytest.mark.parametrize("year, month, expected", [
+        (2018, 1, (17532, 31, 2)),
+        (2020, 2, (18293, 29, 7)),
+        (2100, 2, (47513, 28, 2)),
+        (2250, 2, (102299, 28, 6)),
+    ])
+    def test_month(self, year, month, expected):
+        info = CalendarTable().month(year, month)
+        assert (info.start, info.length, info.first_weekday) == expected
+
+    def test_weekdays(self):
+        table = CalendarTable()
+        # January 2018 starts on a Monday.
+        assert table.nth_weekday(2018, 1, 7, 3) == 20
+        assert table.nth_weekday(2018, 1, 2, 5) == 29
+        assert table.nth_weekday(2018, 1, 7, 5) is None
+        assert table.last_weekday(2018, 1, 7) == 27
+        assert table.last_weekday(2018, 1, 4) == 31
+
+    def test_year_kinds(self):
+        table = CalendarTable()
+        assert len(table.year_kinds) == 14
+        masks = [mask for sample, mask in table.year_kinds]
+        assert sum(masks) == (1 << 230) - 1
+        for sample, mask in table.year_kinds:
+            assert mask >> (sample - 1970) & 1
+
+
+class TestCountBetween(object):
+    @pytest.mark.parametrize("expression, date_1, date_2, expected", [
+        (
+            "* * * ? * * *",
+            datetime(2018, 1, 1, 0, 0, 0),
+            datetime(2018, 1, 31, 23, 59, 59),
+            31 * 86400
+        ),
+        (
+            "* * * ? * * *",
+            datetime(1970, 1, 1, 0, 0, 0),
+            datetime(2199, 12, 31, 23, 59, 59),
+            7258118400
+        ),
+        (
+            "0 0 12 ? * Sat#3 2018",
+            datetime(2017, 1, 1, 0, 0, 0),
+            datetime(2019, 1, 1, 0, 0, 0),
+            12
+        ),
+        (
+            "0 0 12 ? * Sat#3 2018",
+            datetime(2018, 1, 20, 12, 0, 0),
+            datetime(2018, 3, 17, 12, 0, 0),
+            3
+        ),
+        (
+            "0 0 12 ? * Sat#3 2018",
+            datetime(2018, 1, 20, 12, 0, 1),
+            datetime(2018, 3, 17, 11, 59, 59),
+            1
+        ),
+        (
+            "*/20 */30 9-17 ? * MON-FRI *",
+            datetime(2018, 1, 5, 17, 30, 20),
+            datetime(2018, 1, 8, 9, 0, 20),
+            4
+        ),
+        (
+            "0 0 12 29 2 ? *",
+            datetime(2000, 1, 1, 0, 0, 0),
+            datetime(2100, 12, 31, 0, 0, 0),
+            25
+        ),
+        (
+            "0 0 12 ? * * *",
+            datetime(2018, 1, 2, 0, 0, 0),
+            datetime(2018, 1, 1, 0, 0, 0),
+            0
+        ),
+    ])
+    def test_count_between(self, expression, date_1, date_2, expected):
+        awscron_iter = Croniter(CronExpression(expression))
+        assert awscron_iter.count_between(date_1, date_2) == expected
+
+    @pytest.mark.parametrize("expression", [
+        "0 0 ? * MON-FRI *",
+        "0 0 L-3,15W * ? *",
+        "0 0 LW 2,3 ? 1975,1999-2003/2",
+        "0 0 ? * 2L,6#3 2000-2050",
+    ])
+    @pytest.mark.parametrize("date_1, date_2", [
+        (datetime(1960, 3, 5), datetime(2210, 1, 1)),
+        (datetime(1970, 1, 1), datetime(2199, 12, 31)),
+        (datetime(1999, 12, 31), datetime(2001, 1, 1)),
+        (datetime(2000, 6, 15), datetime(2049, 2, 28)),
+    ])
+    def test_count_days(self, expression, date_1, date_2):
+        compiled = CronExpression(expression).compiled
+        day_1 = int(Croniter.datetime_to_timestamp(date_1)) // 86400
+        day_2 = int(Croniter.datetime_to_timestamp(date_2)) // 86400
+        assert compiled.count_days(day_1, day_2) == (
+            compiled.count_month_days(day_1, day_2)
+        )
+
+    @pytest.mark.parametrize("expression", [
+        "*/7 */13 5/5 ? 2,5 Sat#3 *",
+        "15 10 * ? * Mon#1,Fri#5 *",
+        "*/5 */3 1-9 1,15 * ? *",
+    ])
+    def test_matches_get_next(self, expression):
+        awscron_iter = Croniter(
+            CronExpression(expression), datetime(2017, 12, 31, 23, 59, 59)
+        )
+        executions = [awscron_iter.get_next(datetime) for _ in range(200)]
+        assert awscron_iter.count_between(
+            datetime(2018, 1, 1), executions[-1]
+        ) == 200
+        assert awscron_iter.count_between(
+            executions[10], executions[-10]
+        ) == 181
+
+
+class TestIterChunks(object):
+    def test_chunks(self):
+        awscron_iter = Croniter(CronExpression("*/20 * * ? * * *"))
+        chunks = list(awscron_iter.iter_chunks(
+            datetime(2018, 1, 1, 0, 0, 0), datetime(2018, 1, 1, 0, 3, 0), 4
+        ))
+        start = Croniter.datetime_to_timestamp(datetime(2018, 1, 1))
+        assert [chunk for chunk, cursor in chunks] == [
+            [start + offset for offset in range(0, 80, 20)],
+            [start + offset for offset in range(80, 160, 20)],
+            [start + 160, start + 180],
+        ]
+        assert chunks[-1][1] is None
+
+    def test_resume_from_cursor(self):
+        awscron_iter = Croniter(CronExpression("0 0 12 ? * Sat#3 *"))
+        start, end = datetime(2018, 1, 1), datetime(2020, 1, 1)
+        expected = list(awscron_iter.iter_chunks(start, end, 5))
+        chunk, cursor = expected[0]
+        resumed = list(awscron_iter.iter_chunks(start, end, 5, cursor))
+        assert resumed == expected[1:]
+        assert sum(len(chunk) for chunk, cursor in expected) == 24
+
+    def test_bad_cursor(self):
+        awscron_iter = Croniter(CronExpression("0 0 12 ? * Sat#3 *"))
+        with pytest.raises(CroniterError):
+            next(awscron_iter.iter_chunks(
+                datetime(2018, 1, 1), datetime(2020, 1, 1), 5, 'nope'
+            ))
+
+
+class TestRecords(object):
+    EXPRESSIONS = [
+        "0 0 12 ? * Sat#3 2018",
+        "*/20 */30 9-17 ? * MON-FRI *",
+        "0 0 12 29 2 ? 2199",
+        "* * * * * ? *",
+        "0 0 0 ? * 2#1,2#5,6#3 1970",
+    ]
+
+    @pytest.mark.parametrize("expression", EXPRESSIONS)
+    def test_round_trip(self, expression):
+        compiled = CronExpression(expression).compiled
+        record = compiled.to_bytes()
+        assert len(record) == RECORD.size == 80
+        assert CompiledExpression.from_bytes(record) == compiled
+
+    def test_pack_many(self, tmp_path):
+        import mmap
+        compiled_expressions = [
+            CronExpression(expression).compiled
+            for expression in self.EXPRESSIONS
+        ]
+        path = tmp_path / 'rules.bin'
+        path.write_bytes(pack_many(compiled_expressions))
+        with open(str(path), 'rb') as rules_file:
+            buffer = mmap.mmap(rules_file.fileno(), 0, access=mmap.ACCESS_READ)
+            assert record_count(buffer) == 5
+            assert list(unpack_many(buffer)) == compiled_expressions
+            assert unpack_record(buffer, 2) == compiled_expressions[2]
+            buffer.close()
+
+    @pytest.mark.parametrize("data", [
+        b'', b'CRNX', pack_many([])[:-1],
+        b'XXXX' + pack_many([])[4:],
+        pack_many([CronExpression("* * * * * ? *").compiled])[:-1],
+    ])
+    def test_bad_buffer(self, data):
+        with pytest.raises(CroniterError):
+            list(unpack_many(data))
+
+    def test_bad_record(self):
+        record = bytearray(CronExpression("* * * * * ? *").compiled.to_bytes())
+        with pytest.raises(CroniterError):
+            CompiledExpression.from_bytes(record[:-20])
+        record[0] = 2
+        with pytest.raises(CroniterError):
+            CompiledExpression.from_bytes(record)
+
+
+class TestCanonical(object):
+    @pytest.mark.parametrize("expressions, expected", [
+        ([
+            "0 0 * ? * MON-FRI *", "0 0 * ? * 2-6 *",
+            "0 0 * ? * mon,tue,wed,thu,fri *", "0  0 * ? * 6,5,4,3,2 *",
+        ], "0 0 * ? * 2-6 *"),
+        (["0 10 * * ? *", "0 0 10 ? * * *", "0 0 10 1-31 * ? 1970-2199"],
+         "0 0 10 * * ? *"),
+        (["*/15 8-17 ? * 2#1,4#3,FRI *", "0 0,15,30,45 8-17 ? * 6,2#1,4#3 *"],
+         "0 0,15,30,45 8-17 ? * 6,2#1,4#3 *"),
+        (["0 0 12 ? * Sat#3 2018", "0 0 12 ? * 7#3 2018"],
+         "0 0 12 ? * 7#3 2018"),
+    ])
+    def test_canonical(self, expressions, expected):
+        obj_expressions = [CronExpression(expr) for expr in expressions]
+        assert len(set(obj.canonical_key for obj in obj_expressions)) == 1
+        for obj_expression in obj_expressions:
+            assert obj_expression.canonical_expression == expected
+        assert CronExpression(expected).canonical_key == \
+            obj_expressions[0].canonical_key
+
+    def test_distinct(self):
+        assert CronExpression("0 0 * ? * MON *").canonical_key != \
+            CronExpression("0 0 * ? * MON#1 *").canonical_key
+
+
+class TestTimeZone(object):
+    @pytest.mark.parametrize("expression, start_time, expected", [
+        # 02:30 does not exist on 2018-03-11 in New York.
+        ("0 30 2 * * ? *", datetime(2018, 3, 10, 0, 0), [
+            datetime(2018, 3, 10, 7, 30), datetime(2018, 3, 12, 6, 30),
+        ]),
+        # 01:30 happens twice on 2018-11-04, only the first one runs.
+        ("0 30 1 * * ? *", datetime(2018, 11, 4, 0, 0), [
+            datetime(2018, 11, 4, 5, 30), datetime(2018, 11, 5, 6, 30),
+        ]),
+        ("0 0 9 ? * MON-FRI *", datetime(2018, 7, 6, 14, 0), [
+            datetime(2018, 7, 9, 13, 0), datetime(2018, 7, 10, 13, 0),
+        ]),
+    ])
+    def test_get_next(self, expression, start_time, expected):
+        awscron_iter = Croniter(
+            CronExpression(expression),
+            start_time.replace(tzinfo=timezone.utc), datetime,
+            'America/New_York'
+        )
+        results = [awscron_iter.get_next() for _ in expected]
+        assert [
+            result.astimezone(timezone.utc).replace(tzinfo=None)
+            for result in results
+        ] == expected
+        assert results[0].tzinfo is not None
+
+    def test_get_prev(self):
+        # From the second 01:15, the latest run is the first 01:30.
+        awscron_iter = Croniter(
+            CronExpression("0 30 1 * * ? *"),
+            datetime(2018, 11, 4, 6, 15, tzinfo=timezone.utc),
+            tz='America/New_York'
+        )
+        assert awscron_iter.get_prev() == Croniter.datetime_to_timestamp(
+            datetime(2018, 11, 4, 5, 30)
+        )
+
+    def test_count_between(self):
+        awscron_iter = Croniter(
+            CronExpression("0 */30 * * * ? *"), tz='America/New_York'
+        )
+        # Local days of 23 and 25 hours, the repeated hour runs once.
+        assert awscron_iter.count_between(
+            datetime(2018, 3, 11), datetime(2018, 3, 11, 23, 59, 59)
+        ) == 46
+        assert awscron_iter.count_between(
+            datetime(2018, 11, 4), datetime(2018, 11, 4, 23, 59, 59)
+        ) == 48
+
+    def test_naive_datetimes_are_local(self):
+        awscron_iter = Croniter(
+            CronExpression("0 0 12 ? * * *"), datetime(2018, 6, 2),
+            datetime, 'America/New_York'
+        )
+        assert awscron_iter.get_next() == datetime(
+            2018, 6, 2, 16, tzinfo=timezone.utc
+        )
+        assert awscron_iter.executes_between(
+            datetime(2018, 6, 2, 12), datetime(2018, 6, 2, 13)
+        )
+        assert not awscron_iter.executes_between(
+            datetime(2018, 6, 2, 12, tzinfo=timezone.utc),
+            datetime(2018, 6, 2, 13, tzinfo=timezone.utc)
+        )
+        # 02:30 was skipped, it reads as the 03:00 the clock jumped to.
+        assert awscron_iter.to_timestamp(
+            datetime(2018, 3, 11, 2, 30)
+        ) == Croniter.datetime_to_timestamp(datetime(2018, 3, 11, 7))
+
+    def test_unknown_zone(self):
+        with pytest.raises(CroniterError):
+            Croniter(CronExpression("0 0 * * ? *"), tz='Nowhere/Land')
+
+
+class TestRateExpression(object):
+    @pytest.mark.parametrize("expression, period", [
+        ("rate(1 minute)", 60),
+        ("rate(5 minutes)", 300),
+        ("Rate(2  Hours)", 7200),
+        ("rate(1 day)", 86400),
+    ])
+    def test_parse(self, expression, period):
+        assert RateExpression(expression).compiled.period == period
+
+    @pytest.mark.parametrize("expression", [
+        "rate(0 minutes)", "rate(1 minutes)", "rate(5 minute)",
+        "rate(5 weeks)", "rate(-5 minutes)", "rate(5minutes)",
+        "0 10 * * ? *",
+    ])
+    def test_bad_expression(self, expression):
+        with pytest.raises(CroniterBadCronError):
+            RateExpression(expression)
+
+    def test_get_next_prev(self):
+        anchor = datetime(2018, 1, 1, 0, 0, 30)
+        awscron_iter = Croniter(
+            RateExpression("rate(5 minutes)", anchor),
+            datetime(2018, 1, 1, 0, 5, 30), datetime
+        )
+        assert awscron_iter.get_next() == datetime(2018, 1, 1, 0, 10, 30)
+        assert awscron_iter.get_next() == datetime(2018, 1, 1, 0, 15, 30)
+        assert awscron_iter.get_prev() == datetime(2018, 1, 1, 0, 10, 30)
+        assert awscron_iter.get_prev() == datetime(2018, 1, 1, 0, 5, 30)
+        assert awscron_iter.get_prev() == datetime(2018, 1, 1, 0, 0, 30)
+        with pytest.raises(CroniterBadDateError):
+            awscron_iter.get_prev()
+
+    def test_count_between(self):
+        awscron_iter = Croniter(
+            RateExpression("rate(1 hour)", datetime(2018, 1, 1, 12))
+        )
+        assert awscron_iter.count_between(
+            datetime(2018, 1, 1), datetime(2018, 1, 2)
+        ) == 13
+        assert awscron_iter.executes_between(
+            datetime(2018, 1, 1, 12, 1), datetime(2018, 1, 1, 12, 59)
+        ) is False
+        assert [
+            epoch for chunk, _ in awscron_iter.iter_chunks(
+                datetime(2018, 1, 1, 12), datetime(2018, 1, 1, 15), 2
+            ) for epoch in chunk
+        ] == [1514808000 + 3600 * hour for hour in range(4)]
+
+    def test_canonical(self):
+        assert RateExpression("rate(60 minutes)").canonical_key == \
+            RateExpression("rate(1 hour)").canonical_key
+        assert RateExpression("rate(120 minutes)").canonical_expression == \
+            "rate(2 hours)"
+        assert RateExpression("rate(1 hour)", 60).canonical_key != \
+            RateExpression("rate(1 hour)").canonical_key
+
+    def test_parse_expression(self):
+        assert isinstance(parse_expression("rate(1 day)"), RateExpression)
+        assert isinstance(
+            parse_expression("cron(0 10 * * ? *)"), CronExpression
+        )
+        assert parse_expression("cron(0 10 * * ? *)").expression == \
+            "0 10 * * ? *"
+        assert CronExpression.from_cache("rate(1 day)") is \
+            RateExpression.from_cache("rate(1 day)")
+
+    def test_record(self):
+        compiled = RateExpression("rate(7 minutes)", 1234).compiled
+        assert CompiledExpression.from_bytes(compiled.to_bytes()) == compiled
@@ -0,0 +1,104 @@
+import pytest
+
+from datetime import datetime, timedelta, timezone
+
+from src.croniter import croniter
+
+
+class TestCroniter(object):
+    def test_construction_is_silent(self, capsys):
+        croniter('*/5 8-17 * * 1-5', datetime(2018, 1, 1))
+        assert capsys.readouterr().out == ''
+
+    def test_expansion_is_not_mutated(self):
+        cron = croniter('0 12 * * 6#3', datetime(2018, 1, 1))
+        expanded = cron.expanded
+        nth_weekday_of_month = cron.nth_weekday_of_month
+        cron.get_next()
+        cron.get_prev()
+        assert cron.expanded is expanded
+        assert cron.nth_weekday_of_month is nth_weekday_of_month
+
+    @pytest.mark.parametrize("expression, start_time, expected", [
+        (
+            '*/5 8-17 * * 1-5', datetime(2018, 1, 5, 17, 55),
+            [datetime(2018, 1, 8, 8, 0), datetime(2018, 1, 8, 8, 5)]
+        ),
+        (
+            '0 12 * * 6#3', datetime(2018, 1, 1),
+            [datetime(2018, 1, 20, 12, 0), datetime(2018, 2, 17, 12, 0)]
+        ),
+        (
+            '0 0 1,15 * 1', datetime(2018, 1, 1),
+            [datetime(2018, 1, 8), datetime(2018, 1, 15)]
+        ),
+        (
+            '0 0 L * *', datetime(2020, 1, 31, 12),
+            [datetime(2020, 2, 29), datetime(2020, 3, 31)]
+        ),
+    ])
+    def test_get_next_naive(self, expression, start_time, expected):
+        cron = croniter(expression, start_time)
+        assert [cron.get_next(datetime) for _ in expected] == expected
+
+    @pytest.mark.parametrize("expression, start_time, expected", [
+        (
+            '0 0 31 * *', datetime(2018, 3, 10, 12),
+            [datetime(2018, 1, 31), datetime(2017, 12, 31)]
+        ),
+        (
+            '0 9 * 2 *', datetime(2020, 3, 1),
+            [datetime(2020, 2, 29, 9), datetime(2020, 2, 28, 9)]
+        ),
+        (
+            '15 10 29 2 *', datetime(2018, 3, 10),
+            [datetime(2016, 2, 29, 10, 15), datetime(2012, 2, 29, 10, 15)]
+        ),
+        (
+            '0 0 1,15 * 1', datetime(2018, 1, 16),
+            [datetime(2018, 1, 15), datetime(2018, 1, 8)]
+        ),
+    ])
+    def test_get_prev_naive(self, expression, start_time, expected):
+        cron = croniter(expression, start_time)
+        assert [cron.get_prev(datetime) for _ in expected] == expected
+
+    def test_seconds_field(self):
+        cron = croniter('* * * * * */20', 1.5)
+        assert [cron.get_next() for _ in range(3)] == [20.0, 40.0, 60.0]
+        assert cron.get_prev() == 40.0
+
+    @pytest.mark.parametrize("tzinfo, epoch_engine", [
+        (None, True),
+        (timezone.utc, True),
+        (timezone(timedelta(hours=2)), False),
+    ])
+    def test_epoch_engine_selection(self, tzinfo, epoch_engine):
+        cron = croniter('0 0 * * *', datetime(2018, 1, 1, tzinfo=tzinfo))
+        assert (cron._compiled is not None) == epoch_engine
+
+    @pytest.mark.parametrize("expression, start_time, is_prev, expected", [
+        ('0 0 1 1 *', datetime(2199, 6, 1), False, datetime(2200, 1, 1)),
+        ('0 0 1 6 *', datetime(1970, 3, 1), True, datetime(1969, 6, 1)),
+    ])
+    def test_past_epoch_engine_years(self, expression, start_time, is_prev,
+                                     expected):
+        cron = croniter(expression, start_time)
+        assert cron._compiled is not None
+        if is_prev:
+            assert cron.get_prev(datetime) == expected
+        else:
+            assert cron.get_next(datetime) == expected
+
+    def test_last_day_on_epoch_engine(self):
+        cron = croniter('0 0 L * *', datetime(2018, 3, 10))
+        assert cron._compiled is not None
+        assert cron.get_prev(datetime) == datetime(2018, 2, 28)
+
+    def test_utc_datetime_results(self):
+        cron = croniter(
+            '0 12 * * 6#3', datetime(2018, 1, 1, tzinfo=timezone.utc)
+        )
+        assert cron.get_next(datetime) == datetime(
+            2018, 1, 20, 12, tzinfo=timezone.utc
+        )
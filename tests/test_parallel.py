@@ -0,0 +1,145 @@
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from src import parallel
+from src.aws_croniter import (
+    CronExpression, Croniter, CroniterBadCronError, CroniterSyntaxError
+)
+from src.parallel import evaluate_many, validate_many
+
+EXPRESSIONS = [
+    "0 0 12 ? * Sat#3 2018",
+    "*/20 */30 9-17 ? * MON-FRI *",
+    "0 0 12 29 2 ? *",
+    "0 0 0 1 1 ? 2017",
+    "0 30 9 ? * TUE *",
+] * 7
+
+DATE_1 = datetime(2018, 1, 1)
+DATE_2 = datetime(2018, 1, 20)
+
+
+def expected():
+    results = []
+    for expression in EXPRESSIONS:
+        awscron_iter = Croniter(CronExpression(expression), DATE_1)
+        awscron_iter.cur -= 1
+        try:
+            next_epoch = int(awscron_iter.get_next())
+        except Exception:
+            next_epoch = None
+        results.append((
+            awscron_iter.executes_between(DATE_1, DATE_2), next_epoch
+        ))
+    return results
+
+
+class TestEvaluateMany(object):
+    @pytest.mark.parametrize("max_workers, chunksize", [
+        (1, None), (2, None), (2, 3),
+    ])
+    def test_process_pool(self, max_workers, chunksize):
+        obj_expressions = [CronExpression(expr) for expr in EXPRESSIONS]
+        assert evaluate_many(
+            obj_expressions, DATE_1, DATE_2, max_workers, chunksize
+        ) == expected()
+
+    def test_executor(self):
+        obj_expressions = [CronExpression(expr) for expr in EXPRESSIONS]
+        with ThreadPoolExecutor(2) as executor:
+            assert evaluate_many(
+                obj_expressions, DATE_1, DATE_2, chunksize=4,
+                executor=executor
+            ) == expected()
+
+
+VALIDATE_EXPRESSIONS = [
+    "0 0 12 ? * Sat#3 2018",
+    "0 61 * ? * * *",
+    "rate(5 minutes)",
+    "cron(0 0 * ? * MON-FRI *)",
+    "rate(1 minutes)",
+    "0 0 ² ? * * *",
+    None,
+    ["0 0 * ? * * *"],
+] * 5
+
+
+class TestValidateMany(object):
+    @pytest.mark.parametrize("max_workers, chunksize", [
+        (1, None), (1, 2), (2, 3),
+    ])
+    def test_results(self, max_workers, chunksize):
+        results = list(validate_many(
+            iter(VALIDATE_EXPRESSIONS), max_workers, chunksize
+        ))
+        assert [index for index, ok, error in results] == list(
+            range(len(VALIDATE_EXPRESSIONS))
+        )
+        assert [ok for index, ok, error in results] == [
+            True, False, True, True, False, False, False, False
+        ] * 5
+        for index, ok, error in results:
+            assert ok == (error is None)
+        error = results[1][2]
+        assert isinstance(error, CroniterSyntaxError)
+        assert (error.field_name, error.position) == ('minute', 2)
+        assert isinstance(results[6][2], CroniterBadCronError)
+        assert isinstance(results[7][2], CroniterBadCronError)
+
+    def test_in_process_by_default(self, monkeypatch):
+        monkeypatch.setattr(parallel, 'ProcessPoolExecutor', None)
+        results = list(validate_many(VALIDATE_EXPRESSIONS))
+        assert len(results) == len(VALIDATE_EXPRESSIONS)
+
+    def test_executor(self):
+        with ThreadPoolExecutor(2) as executor:
+            results = list(validate_many(
+                VALIDATE_EXPRESSIONS, 2, chunksize=4, executor=executor
+            ))
+        assert [ok for index, ok, error in results] == [
+            True, False, True, True, False, False, False, False
+        ] * 5
+
+    def test_deduplicates(self, monkeypatch):
+        validated = []
+
+        def validate_expression(expression):
+            validated.append(expression)
+            return None
+        monkeypatch.setattr(
+            parallel, 'validate_expression', validate_expression
+        )
+        results = validate_many(
+            VALIDATE_EXPRESSIONS, max_workers=1, chunksize=10
+        )
+        assert next(results) == (0, True, None)
+        # The distinct strings of the first batch, then each non-string.
+        assert len(validated) == 6
+        assert len(list(results)) == len(VALIDATE_EXPRESSIONS) - 1
+        assert len(validated) == 6 + 2 * 5
+
+    def test_bounded_memory(self, monkeypatch):
+        validated = []
+
+        def validate_expression(expression):
+            validated.append(expression)
+            return None
+        monkeypatch.setattr(
+            parallel, 'validate_expression', validate_expression
+        )
+        monkeypatch.setattr(parallel, 'VALIDATED_LIMIT', 2)
+        expressions = ["0 {} * ? * * *".format(minute) for minute in range(5)]
+        results = validate_many(expressions * 3, max_workers=1, chunksize=5)
+        assert [ok for index, ok, error in results] == [True] * 15
+        # Only the first two results are remembered across batches.
+        assert len(validated) == 5 + 3 + 3
+
+    def test_unhashable(self):
+        results = list(validate_many(
+            [["0 0 * ? * * *"], {}, "0 0 * ? * * *"], max_workers=1
+        ))
+        assert [ok for index, ok, error in results] == [False, False, True]
+        assert isinstance(results[0][2], CroniterBadCronError)
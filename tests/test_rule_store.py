@@ -0,0 +1,73 @@
+import pytest
+
+from datetime import datetime
+
+from src import rule_store
+from src.aws_croniter import CronExpression, Croniter, parse_expression
+from src.rule_store import RuleStore
+
+EXPRESSIONS = [
+    "* * * ? * * *",
+    "0 0 * ? * * *",
+    "0 30 9 ? * MON-FRI *",
+    "0 30 9 ? * TUE#3 *",
+    "0 30 9 1 * ? *",
+    "0 30 9 ? * * 2019",
+    "0 0 0 1 1 ? 2017",
+    "rate(30 minutes)",
+    "0 30 9 LW * ? *",
+    "0 30 9 ? * 3L *",
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    with RuleStore.create(
+        str(tmp_path / 'rules.bin'), map(parse_expression, EXPRESSIONS)
+    ) as store:
+        yield store
+
+
+class TestRuleStore(object):
+    @pytest.mark.parametrize("use_numpy", [True, False])
+    @pytest.mark.parametrize("timestamp, expected", [
+        (datetime(2018, 1, 16, 9, 30, 0), [0, 2, 3, 7]),
+        (datetime(2018, 1, 16, 9, 30, 1), [0]),
+        (datetime(2018, 1, 9, 9, 30, 0), [0, 2, 7]),
+        (datetime(2019, 6, 1, 9, 30, 0), [0, 4, 5, 7]),
+        (datetime(2019, 6, 1, 10, 0, 0), [0, 1, 7]),
+        (datetime(2017, 1, 1, 0, 0, 0), [0, 1, 6, 7]),
+        (datetime(2018, 1, 30, 9, 30, 0), [0, 2, 7, 9]),
+        (datetime(2018, 1, 31, 9, 30, 0), [0, 2, 7, 8]),
+        (datetime(2018, 6, 29, 9, 30, 0), [0, 2, 7, 8]),
+        (datetime(2200, 1, 1, 0, 0, 0), []),
+    ])
+    def test_fires_at(self, store, monkeypatch, use_numpy, timestamp,
+                      expected):
+        if use_numpy:
+            pytest.importorskip('numpy')
+        else:
+            monkeypatch.setattr(rule_store, 'np', None)
+        assert store.fires_at(timestamp) == expected
+
+    def test_next_fire_time(self, store):
+        start = datetime(2018, 1, 1)
+        for rule_id, expression in enumerate(EXPRESSIONS):
+            if rule_id == 6:
+                assert store.next_fire_time(rule_id, start) is None
+                continue
+            assert store.next_fire_time(rule_id, start) == Croniter(
+                parse_expression(expression), start
+            ).get_next()
+
+    def test_compiled(self, store):
+        assert len(store) == len(EXPRESSIONS)
+        assert store.compiled(3) == CronExpression(EXPRESSIONS[3]).compiled
+        with pytest.raises(IndexError):
+            store.compiled(len(EXPRESSIONS))
+
+    def test_shared(self, store, tmp_path):
+        with RuleStore(str(tmp_path / 'rules.bin')) as other:
+            assert other.fires_at(datetime(2018, 1, 16, 9, 30)) == [
+                0, 2, 3, 7
+            ]
@@ -0,0 +1,125 @@
+import pytest
+
+from datetime import datetime
+
+from src.aws_croniter import CronExpression, RateExpression
+from src.schedule_index import ScheduleIndex
+
+EXPRESSIONS = {
+    'every-second': "* * * ? * * *",
+    'top-of-hour': "0 0 * ? * * *",
+    'weekdays': "0 30 9 ? * MON-FRI *",
+    'third-tuesday': "0 30 9 ? * TUE#3 *",
+    'first-of-month': "0 30 9 1 * ? *",
+    'year-2019': "0 30 9 ? * * 2019",
+}
+
+
+@pytest.fixture
+def index():
+    index = ScheduleIndex()
+    for rule_id, expression in EXPRESSIONS.items():
+        index.add(rule_id, CronExpression(expression))
+    return index
+
+
+class TestScheduleIndex(object):
+    @pytest.mark.parametrize("timestamp, expected", [
+        (datetime(2018, 1, 16, 9, 30, 0), [
+            'every-second', 'weekdays', 'third-tuesday'
+        ]),
+        (datetime(2018, 1, 16, 9, 30, 1), ['every-second']),
+        (datetime(2018, 1, 9, 9, 30, 0), ['every-second', 'weekdays']),
+        (datetime(2019, 6, 1, 9, 30, 0), [
+            'every-second', 'first-of-month', 'year-2019'
+        ]),
+        (datetime(2019, 6, 1, 10, 0, 0), ['every-second', 'top-of-hour']),
+        (datetime(2200, 1, 1, 0, 0, 0), []),
+    ])
+    def test_fires_at(self, index, timestamp, expected):
+        assert sorted(index.fires_at(timestamp)) == sorted(expected)
+
+    def test_remove(self, index):
+        index.remove('every-second')
+        index.remove('third-tuesday')
+        assert index.fires_at(datetime(2018, 1, 16, 9, 30, 0)) == [
+            'weekdays'
+        ]
+        assert 'weekdays' in index
+        assert len(index) == 4
+
+    def test_replace(self, index):
+        index.add('weekdays', CronExpression("0 30 9 ? * SAT *"))
+        assert 'weekdays' not in index.fires_at(datetime(2018, 1, 9, 9, 30))
+        assert 'weekdays' in index.fires_at(datetime(2018, 1, 13, 9, 30))
+
+    def test_many_rules(self):
+        index = ScheduleIndex()
+        for rule_id in range(1000):
+            index.add(rule_id, CronExpression(
+                "{} * * ? * * *".format(rule_id % 60)
+            ))
+        assert index.fires_at(59) == list(range(59, 1000, 60))
+
+    def test_shared_schedules(self):
+        index = ScheduleIndex()
+        for rule_id, expression in enumerate([
+            "0 0 * ? * MON-FRI *", "0 0 * ? * 2-6 *", "0 0 * ? * SAT *",
+            "0 0 * ? * mon,tue,wed,thu,fri *",
+        ]):
+            index.add(rule_id, CronExpression(expression))
+        assert index.schedule_count() == 2
+        assert index.fires_at(datetime(2018, 1, 9, 5)) == [0, 1, 3]
+        index.remove(0)
+        index.remove(3)
+        assert index.schedule_count() == 2
+        assert index.fires_at(datetime(2018, 1, 9, 5)) == [1]
+        index.remove(1)
+        assert index.schedule_count() == 1
+        assert index.fires_at(datetime(2018, 1, 9, 5)) == []
+        assert index.fires_at(datetime(2018, 1, 13, 5)) == [2]
+
+    def test_rates(self, index):
+        index.add('every-15-minutes', RateExpression("rate(15 minutes)"))
+        index.add('half-past', RateExpression("rate(1 hour)", 1800))
+        index.add('hourly', RateExpression("rate(60 minutes)"))
+        assert index.schedule_count() == len(EXPRESSIONS) + 3
+        assert sorted(index.fires_at(datetime(2018, 1, 1, 10, 0, 0))) == [
+            'every-15-minutes', 'every-second', 'hourly', 'top-of-hour'
+        ]
+        assert sorted(index.fires_at(datetime(2018, 1, 1, 9, 30, 0))) == [
+            'every-15-minutes', 'every-second', 'first-of-month', 'half-past',
+            'weekdays'
+        ]
+        index.remove('every-15-minutes')
+        index.remove('hourly')
+        assert index.fires_at(datetime(2018, 1, 1, 10, 0, 1)) == [
+            'every-second'
+        ]
+        assert index.fires_at(datetime(2018, 1, 1, 10, 0, 0)).count(
+            'every-15-minutes'
+        ) == 0
+
+    def test_day_operators(self, index):
+        index.add('last-day', CronExpression("0 30 9 L * ? *"))
+        index.add('last-weekday', CronExpression("0 30 9 LW * ? *"))
+        index.add('nearest-15th', CronExpression("0 30 9 15W * ? *"))
+        index.add('last-friday', CronExpression("0 30 9 ? * 6L *"))
+        assert sorted(index.fires_at(datetime(2018, 6, 29, 9, 30))) == [
+            'every-second', 'last-friday', 'last-weekday', 'weekdays'
+        ]
+        assert sorted(index.fires_at(datetime(2018, 6, 30, 9, 30))) == [
+            'every-second', 'last-day'
+        ]
+        assert sorted(index.fires_at(datetime(2018, 6, 15, 9, 30))) == [
+            'every-second', 'nearest-15th', 'weekdays'
+        ]
+        index.remove('last-day')
+        assert index.fires_at(datetime(2018, 6, 30, 9, 30)) == [
+            'every-second'
+        ]
+        # The freed slot is reused by a schedule without day operators.
+        index.add('saturdays', CronExpression("0 30 9 ? * SAT *"))
+        assert sorted(index.fires_at(datetime(2018, 6, 30, 9, 30))) == [
+            'every-second', 'saturdays'
+        ]
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from src.aws_croniter import CronExpression, Croniter, RateExpression
+from src.scheduler import Scheduler
+
+START = Croniter.datetime_to_timestamp(datetime(2018, 1, 1))
+
+
+class TestScheduler(object):
+    def test_pop_due_merges_rules(self):
+        scheduler = Scheduler()
+        scheduler.add('every-20s', CronExpression("*/20 * * ? * * *"), START)
+        scheduler.add('every-30s', CronExpression("*/30 * * ? * * *"), START)
+        assert scheduler.next_fire_time() == START + 20
+        due = scheduler.pop_due(START + 60)
+        assert sorted(due, key=lambda item: (item[1], item[0])) == [
+            ('every-20s', START + 20),
+            ('every-30s', START + 30),
+            ('every-20s', START + 40),
+            ('every-20s', START + 60),
+            ('every-30s', START + 60),
+        ]
+        assert scheduler.pop_due(START + 60) == []
+        stats = scheduler.stats()
+        assert stats.rules == 2
+        assert stats.fired == 5
+        assert stats.max_lag == 40
+
+    def test_remove(self):
+        scheduler = Scheduler()
+        scheduler.add('a', CronExpression("0 * * ? * * *"), START)
+        scheduler.add('b', CronExpression("30 * * ? * * *"), START)
+        scheduler.remove('a')
+        assert 'a' not in scheduler
+        assert scheduler.next_fire_time() == START + 30
+        assert scheduler.pop_due(START + 120) == [
+            ('b', START + 30), ('b', START + 90)
+        ]
+
+    def test_exhausted_rules_are_dropped(self):
+        scheduler = Scheduler()
+        scheduler.add('once', CronExpression("0 0 0 1 1 ? 2018"), START - 1)
+        scheduler.add('never', CronExpression("0 0 0 1 1 ? 2017"), START)
+        assert len(scheduler) == 1
+        assert scheduler.pop_due(datetime(2019, 1, 1)) == [('once', START)]
+        assert len(scheduler) == 0
+        assert scheduler.next_fire_time() is None
+
+    def test_rates_and_crons(self):
+        scheduler = Scheduler()
+        scheduler.add('rate', RateExpression("rate(1 minute)", START + 15),
+                      START)
+        scheduler.add('cron', CronExpression("0 * * ? * * *"), START)
+        assert sorted(scheduler.pop_due(START + 120), key=lambda item: (
+            item[1], item[0]
+        )) == [
+            ('rate', START + 15), ('cron', START + 60),
+            ('rate', START + 75), ('cron', START + 120),
+        ]
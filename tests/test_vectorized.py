@@ -0,0 +1,118 @@
+import pytest
+
+from datetime import datetime
+
+from src.aws_croniter import CronExpression, Croniter, RateExpression
+
+np = pytest.importorskip('numpy')
+
+from src.vectorized import match_timestamps  # noqa: E402
+
+
+class TestMatchTimestamps(object):
+    @pytest.mark.parametrize("expression", [
+        "0 0 12 ? * Sat#3 2018",
+        "*/20 */7 * ? * MON-FRI *",
+        "0 0 29 2 ? *",
+        "30 15 10 1,15 2-10/2 ? 2018-2020",
+    ])
+    def test_matches_get_next(self, expression):
+        awscron_iter = Croniter(
+            CronExpression(expression), datetime(2017, 12, 31)
+        )
+        executions = [awscron_iter.get_next() for _ in range(10)]
+        timestamps = np.array(executions, dtype=np.int64)
+        mask = match_timestamps(CronExpression(expression), np.concatenate([
+            timestamps, timestamps + 1, timestamps - 86400 * 366
+        ]))
+        assert mask[:10].all()
+        assert not mask[10:].any()
+
+    def test_datetime64(self):
+        timestamps = np.array([
+            '2018-01-20T12:00:00', '2018-01-13T12:00:00',
+            '2018-02-17T12:00:00', '2018-03-17T12:00:00',
+        ], dtype='datetime64[s]')
+        mask = match_timestamps(
+            CronExpression("0 0 12 ? * Sat#3 *"), timestamps.reshape(2, 2)
+        )
+        assert mask.tolist() == [[True, False], [True, True]]
+
+    def test_out_of_year_range(self):
+        mask = match_timestamps(
+            CronExpression("* * * ? * * *"), np.array([-1, 0])
+        )
+        assert mask.tolist() == [False, True]
+
+
+class TestOccurrences(object):
+    @pytest.mark.parametrize("expression", [
+        "0 0 12 ? * Sat#3 *",
+        "*/7 */13 5/5 ? 2,5 Sat#3 *",
+        "30 15 10 1,15 2-10/2 ? 2018-2022",
+        "* * * ? * * *",
+    ])
+    def test_matches_get_next(self, expression):
+        start = datetime(2018, 1, 1)
+        awscron_iter = Croniter(
+            CronExpression(expression), datetime(2017, 12, 31, 23, 59, 59)
+        )
+        executions = [awscron_iter.get_next() for _ in range(50)]
+
+        result = awscron_iter.occurrences(start, count=50)
+        assert result.dtype == np.int64
+        assert result.tolist() == executions
+
+        result = awscron_iter.occurrences(
+            executions[5] + 1, datetime.utcfromtimestamp(executions[-1])
+        )
+        assert result.tolist() == executions[6:]
+
+    def test_end_of_year_range(self):
+        awscron_iter = Croniter(CronExpression("0 0 0 1 1 ? 2018"))
+        result = awscron_iter.occurrences(datetime(2017, 1, 1), count=5)
+        assert result.tolist() == [1514764800]
+
+    def test_end_or_count(self):
+        awscron_iter = Croniter(CronExpression("0 0 0 1 1 ? *"))
+        with pytest.raises(TypeError):
+            awscron_iter.occurrences(datetime(2017, 1, 1))
+
+
+class TestZonedOccurrences(object):
+    def test_dst(self):
+        awscron_iter = Croniter(
+            CronExpression("0 30 1-2 * * ? *"), tz='America/New_York'
+        )
+        start, end = datetime(2018, 3, 10), datetime(2018, 11, 6)
+        expected = [
+            epoch for chunk, _ in awscron_iter.iter_chunks(start, end)
+            for epoch in chunk
+        ]
+        assert awscron_iter.occurrences(start, end).tolist() == expected
+        assert awscron_iter.occurrences(start, count=9).tolist() == \
+            expected[:9]
+
+
+class TestRateVectorized(object):
+    def test_rate(self):
+        obj_expression = RateExpression("rate(7 minutes)", 1000)
+        awscron_iter = Croniter(obj_expression)
+        assert awscron_iter.occurrences(0, 4000).tolist() == [
+            1000, 1420, 1840, 2260, 2680, 3100, 3520, 3940
+        ]
+        assert awscron_iter.occurrences(1421, count=3).tolist() == [
+            1840, 2260, 2680
+        ]
+        assert match_timestamps(
+            obj_expression, np.array([0, 580, 1000, 1419, 1420])
+        ).tolist() == [False, False, True, False, True]
+
+    def test_rate_with_time_zone(self):
+        awscron_iter = Croniter(
+            RateExpression("rate(5 minutes)"), 0, tz='America/New_York'
+        )
+        assert awscron_iter.occurrences(0, count=3).tolist() == [
+            0, 300, 600
+        ]
+        assert awscron_iter.occurrences(1, 900).tolist() == [300, 600, 900]